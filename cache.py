@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import time
+
+# Small JSON key/value store on disk where every entry expires after a TTL.
+# The file may hold credentials (session cookies), so it is only ever readable
+# and writable by its owner, and it is replaced atomically on every write.
+class FileCache:
+
+    FILE_MODE = 0o600
+
+    def __init__(self, path, ttl):
+
+        self.path = path
+        self.ttl = float(ttl)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.getMany([key]).get(key)
+
+    # Return the still valid entries among keys, as a dict
+    def getMany(self, keys):
+
+        with self.lock:
+            entries = self.load()
+
+        now = time.time()
+        return {key: entries[key]['value'] for key in keys if key in entries and entries[key]['expiresAt'] > now}
+
+    def put(self, key, value, ttl=None):
+        self.putMany({key: value}, ttl)
+
+    def putMany(self, values, ttl=None):
+
+        ttl = self.ttl if ttl is None else float(ttl)
+        if ttl <= 0:
+            return
+
+        expiresAt = time.time() + ttl
+        with self.lock:
+            entries = self.load()
+            entries.update({key: {'value': value, 'expiresAt': expiresAt} for key, value in values.items()})
+            self.store(entries)
+
+    def invalidate(self, key):
+
+        with self.lock:
+            entries = self.load()
+            if entries.pop(key, None) is not None:
+                self.store(entries)
+
+    def load(self):
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cacheFile:
+                entries = json.load(cacheFile)
+        except (OSError, ValueError):
+            return {}
+
+        # Drop expired entries so the file does not grow forever
+        now = time.time()
+        return {key: entry for key, entry in entries.items() if entry.get('expiresAt', 0) > now}
+
+    def store(self, entries):
+
+        tempPath = self.path + '.tmp'
+        fd = os.open(tempPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self.FILE_MODE)
+        # The mode passed to os.open is masked by umask and ignored for existing files
+        os.chmod(tempPath, self.FILE_MODE)
+        with os.fdopen(fd, 'w', encoding='utf-8') as cacheFile:
+            json.dump(entries, cacheFile)
+        os.replace(tempPath, self.path)
@@ -0,0 +1,45 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+from cache import FileCache
+
+class FileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache')
+        self.cache = FileCache(self.path, ttl=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_PutAndGet(self):
+
+        self.cache.put('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(FileCache(self.path, ttl=60).get('key'), 'value')
+        self.assertIsNone(self.cache.get('other'))
+
+    def test_EntriesExpire(self):
+
+        self.cache.put('key', 'value')
+        with mock.patch('cache.time.time', return_value=10**12):
+            self.assertIsNone(self.cache.get('key'))
+
+    def test_FileIsPrivate(self):
+
+        self.cache.put('key', 'value')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_Invalidate(self):
+
+        self.cache.putMany({'a': 1, 'b': 2})
+        self.cache.invalidate('a')
+        self.assertEqual(self.cache.getMany(['a', 'b']), {'b': 2})
+
+    def test_ZeroTtlDisablesCaching(self):
+
+        FileCache(self.path, ttl=0).put('key', 'value')
+        self.assertFalse(os.path.exists(self.path))
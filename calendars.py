@@ -0,0 +1,45 @@
+import csv
+import datetime
+import re
+
+# Holiday calendars loaded from local files, used to skip public holidays in date ranges.
+# Supported formats:
+# - .ics: every VEVENT start date (DTSTART) is a holiday
+# - .csv: the first column of every row holding a YYYY-MM-DD date is a holiday, other rows (headers) are ignored
+
+ICS_DATE_PATTERN = re.compile(r'^DTSTART[^:]*:(\d{8})', re.MULTILINE)
+
+def loadHolidays(paths):
+
+    holidays = set()
+    for path in paths:
+        path = path.strip()
+        if path == '':
+            continue
+        if path.lower().endswith('.ics'):
+            holidays.update(loadIcsHolidays(path))
+        else:
+            holidays.update(loadCsvHolidays(path))
+
+    return sorted(holidays)
+
+def loadIcsHolidays(path):
+
+    with open(path, 'r', encoding='utf-8') as calendarFile:
+        content = calendarFile.read()
+
+    return [datetime.datetime.strptime(date, '%Y%m%d').date() for date in ICS_DATE_PATTERN.findall(content)]
+
+def loadCsvHolidays(path):
+
+    holidays = []
+    with open(path, 'r', encoding='utf-8', newline='') as calendarFile:
+        for row in csv.reader(calendarFile):
+            if not row:
+                continue
+            try:
+                holidays.append(datetime.date.fromisoformat(row[0].strip()))
+            except ValueError:
+                continue
+
+    return holidays
@@ -0,0 +1,29 @@
+import datetime
+import os
+import tempfile
+import unittest
+import calendars
+
+class CalendarsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as calendarFile:
+            calendarFile.write(content)
+        return path
+
+    def test_LoadHolidays(self):
+
+        ics = self.write('holidays.ics', 'BEGIN:VCALENDAR\nBEGIN:VEVENT\nDTSTART;VALUE=DATE:20241225\nSUMMARY:Christmas\nEND:VEVENT\n'
+                                         'BEGIN:VEVENT\nDTSTART:20240101T000000Z\nEND:VEVENT\nEND:VCALENDAR\n')
+        csv = self.write('holidays.csv', 'date,name\n2024-05-01,Labour day\n2024-12-25,Christmas\n')
+
+        self.assertEqual(calendars.loadHolidays([ics, ' ' + csv, '']),
+                         [datetime.date(2024, 1, 1), datetime.date(2024, 5, 1), datetime.date(2024, 12, 25)])
+        self.assertEqual(calendars.loadHolidays([]), [])
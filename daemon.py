@@ -0,0 +1,355 @@
+import hmac
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Long running tracker, for callers invoking tracktime many times a day (editor plugins, cron).
+# The daemon keeps one Tracker warm, with its pooled connections and authenticated session,
+# and serves it on localhost:
+#   POST /track     {"dates", "exceptDates", "issueId", "wholeWeek", "force"} -> {"results": [...]}
+#   GET  /health    -> {"status": "ok"}
+#   POST /shutdown
+# Every request must send the token the daemon writes on start to a file only the user can read,
+# in the X-Tracker-Token header. POSTs must be application/json and carry no Origin header,
+# so neither other local users nor web pages open in a browser can book time or stop the daemon.
+# Submissions arriving within `batchWindow` seconds are flushed together: what they still have to
+# send of the same issue is merged, so overlapping requests from several callers are tracked once.
+
+DEFAULT_PORT = 8737
+DEFAULT_BATCH_WINDOW = 0.05
+DEFAULT_TOKEN_PATH = './.tracker.daemon.token'
+TOKEN_HEADER = 'X-Tracker-Token'
+
+# Intervals of one POST /track, waiting for the flush of their batch
+@dataclass
+class Submission:
+    issueId: str
+    ranges: list
+    force: bool = False
+    # Ranges already submitted before, not sent again
+    skipped: set = field(default_factory=set)
+    results: list = None
+    error: str = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+class TrackerDaemon:
+
+    def __init__(self, tracker, port=DEFAULT_PORT, batchWindow=DEFAULT_BATCH_WINDOW, tokenPath=DEFAULT_TOKEN_PATH):
+
+        self.tracker = tracker
+        self.logging = tracker.logging
+        self.batchWindow = float(batchWindow)
+        self.tokenPath = tokenPath
+        self.token = secrets.token_hex(32)
+        self.submissions = queue.SimpleQueue()
+
+        # Never reachable from another machine
+        self.server = ThreadingHTTPServer(('127.0.0.1', int(port)), self.buildHandler())
+        self.server.daemon_threads = True
+        self.batcher = threading.Thread(target=self.runBatches, name='tracker-batcher', daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def start(self):
+
+        # Authenticate now, so the first caller does not wait for it
+        try:
+            self.tracker.ensureSession()
+        except Exception as e:
+            self.logging.warning('Could not authenticate on start, will retry on the first submission: %s', e)
+
+        self.writeToken()
+        self.batcher.start()
+        threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.logging.info('Tracker daemon listening on [%s]', self.url)
+        return self
+
+    def stop(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.submissions.put(None)
+        self.batcher.join()
+        self.removeToken()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Block the calling thread until /shutdown is requested
+    def serveForever(self):
+
+        self.start()
+        self.batcher.join()
+        self.server.server_close()
+        self.removeToken()
+
+    # Created with mode 0600 and moved in place, so the token is never readable by others
+    def writeToken(self):
+
+        tempPath = self.tokenPath + '.tmp'
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        descriptor = os.open(tempPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as tokenFile:
+            tokenFile.write(self.token)
+        os.replace(tempPath, self.tokenPath)
+
+    def removeToken(self):
+
+        # Left alone when a newer daemon replaced it
+        if readToken(self.tokenPath) == self.token:
+            os.remove(self.tokenPath)
+
+    def isAuthorized(self, headers):
+        return hmac.compare_digest(headers.get(TOKEN_HEADER, '').encode('utf-8'), self.token.encode('utf-8'))
+
+    # Parse a /track request and wait for the flush of the batch it joins
+    def track(self, request):
+
+        # Relative dates such as '17' or '' refer to the day of the request, not of the daemon start
+        self.tracker.initDateFields()
+        issueId = request.get('issueId') or self.tracker.defaultIssueId
+        self.tracker.checkIssues([issueId])
+        isWholeWeek = self.tracker.toBool(str(request.get('wholeWeek', 'false')))
+        planned = self.tracker.planIntervals(request.get('dates', ''), request.get('exceptDates'), isWholeWeek)
+
+        submission = Submission(issueId, [self.tracker.toRange(interval) for interval in planned],
+                                self.tracker.toBool(str(request.get('force', 'false'))))
+        self.submissions.put(submission)
+        submission.done.wait()
+        return submission
+
+    def runBatches(self):
+
+        while True:
+            submission = self.submissions.get()
+            if submission is None:
+                return
+
+            batch = [submission]
+            isStopping = False
+            deadline = time.monotonic() + self.batchWindow
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    submission = self.submissions.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if submission is None:
+                    isStopping = True
+                    break
+                batch.append(submission)
+
+            self.flush(batch)
+            if isStopping:
+                return
+
+    # Submit the intervals of a whole batch at once and give every submission its own results
+    def flush(self, batch):
+
+        try:
+            results = self.submitBatch(batch)
+            for submission in batch:
+                submission.results = [None if dateRange in submission.skipped else self.findResult(results.get(submission.issueId, []), dateRange)
+                                      for dateRange in submission.ranges]
+        except Exception as e:
+            self.logging.error('Failed to flush [%d] submissions: %s', len(batch), e)
+            for submission in batch:
+                submission.error = str(e)
+                submission.done.set()
+            return
+
+        try:
+            self.recordCovered(batch)
+        except Exception as e:
+            # Tracked anyway: only a retry of the same ranges would not be skipped
+            self.logging.warning('Failed to record the requested ranges in the ledger: %s', e)
+
+        for submission in batch:
+            submission.done.set()
+
+    # The ledger only knows the merged worklogs that were sent. The ranges every caller asked for are
+    # recorded too, so a caller retrying its own request later finds it submitted.
+    def recordCovered(self, batch):
+
+        if not self.tracker.ledger:
+            return
+
+        covered = []
+        for submission in batch:
+            for dateRange, result in zip(submission.ranges, submission.results):
+                if result is not None and result.succeeded:
+                    interval = self.tracker.fromRange(dateRange)
+                    covered.append((submission.issueId, interval.startIso, interval.endIso))
+        self.tracker.ledger.recordCovered(covered)
+
+    # The ledger knows the exact intervals sent before, so submitted ones are skipped per submission,
+    # and only what is left of every submission is merged
+    def submitBatch(self, batch):
+
+        tracker = self.tracker
+        rangesByIssue = {}
+        for submission in batch:
+            remaining = submission.ranges
+            if not submission.force:
+                jobs = [(submission.issueId, tracker.fromRange(dateRange)) for dateRange in submission.ranges]
+                remaining = [tracker.toRange(interval) for _, interval in tracker.skipSubmitted(jobs)]
+            submission.skipped = set(submission.ranges) - set(remaining)
+            rangesByIssue.setdefault(submission.issueId, []).extend(remaining)
+
+        jobs = []
+        for issueId, ranges in rangesByIssue.items():
+            jobs.extend((issueId, tracker.fromRange(dateRange)) for dateRange in tracker.coalesceRanges(sorted(ranges), isOverlapWarned=False))
+
+        self.logging.info('Flushing [%d] submissions as [%d] intervals', len(batch), len(jobs))
+        results = {}
+        for result in tracker.runJobs(jobs):
+            results.setdefault(result.issueId, []).append(result)
+        return results
+
+    # The result of the merged interval a requested range became part of.
+    # None when it was skipped because it was already submitted.
+    @staticmethod
+    def findResult(results, dateRange):
+
+        for result in results:
+            if result.interval.start <= dateRange[0] < result.interval.end:
+                return result
+        return None
+
+    def buildHandler(self):
+
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+
+                if not daemon.isAuthorized(self.headers):
+                    self.reply(401, {'error': 'Missing or wrong daemon token'})
+                elif self.path == '/health':
+                    self.reply(200, {'status': 'ok', 'user': daemon.tracker.user})
+                else:
+                    self.reply(404, {'error': 'Not found'})
+
+            def do_POST(self):
+
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                # Sent by browsers, never by submitToDaemon
+                if self.headers.get('Origin') is not None:
+                    self.reply(403, {'error': 'Cross-origin requests are not accepted'})
+                    return
+                if self.headers.get_content_type() != 'application/json':
+                    self.reply(415, {'error': 'Content-Type must be application/json'})
+                    return
+                if not daemon.isAuthorized(self.headers):
+                    self.reply(401, {'error': 'Missing or wrong daemon token'})
+                    return
+
+                try:
+                    request = json.loads(body or b'{}')
+                except ValueError:
+                    self.reply(400, {'error': 'Body must be a JSON object'})
+                    return
+
+                if self.path == '/shutdown':
+                    self.reply(200, {'status': 'stopping'})
+                    threading.Thread(target=daemon.stop, daemon=True).start()
+                elif self.path == '/track':
+                    self.track(request)
+                else:
+                    self.reply(404, {'error': 'Not found'})
+
+            def track(self, request):
+
+                try:
+                    submission = daemon.track(request)
+                except ValueError as e:
+                    self.reply(400, {'error': str(e)})
+                    return
+
+                if submission.error:
+                    self.reply(502, {'error': submission.error})
+                    return
+
+                results = [daemon.toJson(submission.issueId, dateRange, result) for dateRange, result in zip(submission.ranges, submission.results)]
+                self.reply(200, {'results': results})
+
+            def reply(self, status, payload):
+
+                content = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                daemon.logging.debug('Daemon request: ' + format, *args)
+
+        return Handler
+
+    def toJson(self, issueId, dateRange, result):
+
+        interval = self.tracker.fromRange(dateRange)
+        entry = {'issueId': issueId, 'startTime': interval.startIso, 'endTime': interval.endIso}
+        if result is None:
+            entry.update(succeeded=True, skipped=True)
+        else:
+            entry.update(succeeded=result.succeeded, status=result.status, error=result.error)
+        return entry
+
+# daemon.port of the config file, read without jproperties so the client stays cheap to start.
+# Only plain 'key=value' or 'key: value' lines are understood, which is how --generateConf writes it.
+def configuredPort(configPath='./tracker.conf'):
+
+    try:
+        with open(configPath, 'r', encoding='utf-8') as configFile:
+            for line in configFile:
+                key, separator, value = line.strip().replace(':', '=', 1).partition('=')
+                if separator and key.strip() == 'daemon.port' and value.strip():
+                    return int(value.strip())
+    except FileNotFoundError:
+        pass
+    return DEFAULT_PORT
+
+# The token of the running daemon, None when no daemon wrote one
+def readToken(tokenPath=DEFAULT_TOKEN_PATH):
+
+    try:
+        with open(tokenPath, 'r', encoding='utf-8') as tokenFile:
+            return tokenFile.read().strip()
+    except FileNotFoundError:
+        return None
+
+# Send a submission to a running daemon. Only the standard library is used,
+# so the client starts without importing the tracker. Raises OSError when no daemon answers.
+def submitToDaemon(request, port=DEFAULT_PORT, timeout=None, tokenPath=DEFAULT_TOKEN_PATH):
+
+    import urllib.error
+    import urllib.request
+
+    token = readToken(tokenPath)
+    if token is None:
+        raise FileNotFoundError('No daemon token in [{}]'.format(tokenPath))
+
+    httpRequest = urllib.request.Request('http://127.0.0.1:{}/track'.format(int(port)), data=json.dumps(request).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json', TOKEN_HEADER: token}, method='POST')
+    try:
+        with urllib.request.urlopen(httpRequest, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        # Raised as ValueError, so a rejected submission is not mistaken for a missing daemon
+        raise ValueError(json.loads(e.read() or b'{}').get('error', 'Daemon returned status code: {}'.format(e.code)))
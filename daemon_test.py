@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from daemon import DEFAULT_PORT, TOKEN_HEADER, TrackerDaemon, configuredPort, submitToDaemon
+from ledger import Ledger
+from stubserver import StubServer
+from tracker import Tracker
+
+class TrackerDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.stub = StubServer().start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledger = Ledger(os.path.join(self.directory.name, 'ledger.db'))
+        self.tracker = Tracker('user', 'pass', self.stub.trackingUrl, self.stub.authUrl, '09:00', '17:00', 'TASK', ledger=self.ledger)
+        self.tokenPath = os.path.join(self.directory.name, 'daemon.token')
+        self.daemon = TrackerDaemon(self.tracker, port=0, batchWindow=0.2, tokenPath=self.tokenPath).start()
+        self.port = self.daemon.server.server_address[1]
+
+    def tearDown(self):
+
+        self.daemon.stop()
+        self.tracker.transport.close()
+        self.ledger.close()
+        self.stub.stop()
+        self.directory.cleanup()
+
+    def submit(self, request, port=None):
+        return submitToDaemon(request, port or self.port, tokenPath=self.tokenPath)
+
+    def test_ConcurrentSubmissionsAreCoalesced(self):
+
+        responses = {}
+
+        def submit(name, dates):
+            responses[name] = self.submit({'dates': dates})
+
+        threads = [threading.Thread(target=submit, args=('morning', '2024-02-05[09:00-12:00]')),
+                   threading.Thread(target=submit, args=('day', '2024-02-05[11:00-17:00]'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([(worklog['startTime'], worklog['endTime']) for worklog in self.stub.worklogs],
+                         [('2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')])
+        self.assertEqual([(result['startTime'], result['succeeded']) for result in responses['morning']['results']],
+                         [('2024-02-05T09:00:00.000Z', True)])
+        self.assertEqual(responses['day']['results'][0]['status'], 200)
+
+        # Already submitted: skipped without a request
+        response = self.submit({'dates': '2024-02-05'})
+        self.assertTrue(response['results'][0]['skipped'])
+        self.assertEqual(len(self.stub.worklogs), 1)
+
+    def test_SubmittedRangesAreNotMergedAgain(self):
+
+        self.submit({'dates': '2024-02-05[09:00-12:00]'})
+        responses = {}
+
+        def submit(name, dates):
+            responses[name] = self.submit({'dates': dates})
+
+        threads = [threading.Thread(target=submit, args=('again', '2024-02-05[09:00-12:00]')),
+                   threading.Thread(target=submit, args=('next', '2024-02-05[12:00-13:00]'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([(worklog['startTime'], worklog['endTime']) for worklog in self.stub.worklogs],
+                         [('2024-02-05T09:00:00.000Z', '2024-02-05T12:00:00.000Z'), ('2024-02-05T12:00:00.000Z', '2024-02-05T13:00:00.000Z')])
+        self.assertTrue(responses['again']['results'][0]['skipped'])
+        self.assertEqual(responses['next']['results'][0]['status'], 200)
+
+    def test_MergedRangesAreSkippedWhenRetried(self):
+
+        responses = {}
+
+        def submit(name, dates):
+            responses[name] = self.submit({'dates': dates})
+
+        threads = [threading.Thread(target=submit, args=('a', '2024-02-05[09:00-12:00]')),
+                   threading.Thread(target=submit, args=('b', '2024-02-05[12:00-17:00]'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.stub.worklogs), 1)
+
+        # Each caller retrying its own request finds it submitted
+        self.assertTrue(self.submit({'dates': '2024-02-05[09:00-12:00]'})['results'][0]['skipped'])
+        self.assertTrue(self.submit({'dates': '2024-02-05[12:00-17:00]'})['results'][0]['skipped'])
+        self.assertEqual(len(self.stub.worklogs), 1)
+        # Counted once, as the worklog sent
+        self.assertEqual(self.tracker.ledger.totals('day'), [('2024-02-05', 'TASK', 8 * 3600, 1)])
+
+    def test_InvalidSubmissionIsRejected(self):
+
+        with self.assertRaisesRegex(ValueError, 'invalid format'):
+            self.submit({'dates': 'someday'})
+
+    def test_Health(self):
+
+        with urllib.request.urlopen(urllib.request.Request(self.daemon.url + '/health', headers={TOKEN_HEADER: self.daemon.token})) as response:
+            self.assertEqual(json.loads(response.read())['status'], 'ok')
+
+    def test_ForgedRequestsAreRejected(self):
+
+        self.assertEqual(os.stat(self.tokenPath).st_mode & 0o777, 0o600)
+        body = json.dumps({'dates': '2024-02-06'}).encode('utf-8')
+        token = {TOKEN_HEADER: self.daemon.token}
+        forged = [({'Content-Type': 'text/plain', **token}, 415),
+                  ({'Content-Type': 'application/json', 'Origin': 'https://evil.example', **token}, 403),
+                  ({'Content-Type': 'application/json'}, 401),
+                  ({'Content-Type': 'application/json', TOKEN_HEADER: 'guess'}, 401)]
+        for headers, status in forged:
+            for path in ('/track', '/shutdown'):
+                request = urllib.request.Request(self.daemon.url + path, data=body, headers=headers, method='POST')
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(request)
+                self.assertEqual(error.exception.code, status)
+
+        self.assertEqual(self.stub.worklogs, [])
+        self.assertEqual(len(self.submit({'dates': '2024-02-06'})['results']), 1)
+
+    def test_TokenIsRemovedOnStop(self):
+
+        self.daemon.stop()
+        self.assertFalse(os.path.exists(self.tokenPath))
+        # No daemon token: the client tracks directly
+        with self.assertRaises(OSError):
+            self.submit({'dates': '2024-02-05'})
+        self.daemon = TrackerDaemon(self.tracker, port=0, tokenPath=self.tokenPath).start()
+
+    def test_ClientWithoutDaemon(self):
+
+        with self.assertRaises(OSError):
+            self.submit({'dates': '2024-02-05'}, self.port + 1 if self.port < 65535 else 1)
+
+    def test_ConfiguredPort(self):
+
+        configPath = os.path.join(self.directory.name, 'tracker.conf')
+        self.assertEqual(configuredPort(configPath), DEFAULT_PORT)
+
+        with open(configPath, 'w', encoding='utf-8') as configFile:
+            configFile.write('# daemon.port = 1\ntracking.url = http://localhost:8080/track\ndaemon.port = 9001\n')
+        self.assertEqual(configuredPort(configPath), 9001)
+
+if __name__ == '__main__':
+    unittest.main()
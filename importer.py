@@ -0,0 +1,98 @@
+import csv
+import json
+from dataclasses import dataclass, field
+
+# Columns (CSV) or keys (JSONL) understood in a bulk import file.
+# Only 'dates' is mandatory; the others fall back to the tracker defaults.
+FIELDS = ('dates', 'issueId', 'exceptDates', 'wholeWeek')
+# Every field is text, wholeWeek may also be a JSON boolean
+FIELD_TYPES = {'wholeWeek': (str, bool)}
+
+@dataclass
+class ImportRow:
+    lineNumber: int
+    values: dict = None
+    error: str = None
+
+# Totals of a bulk import. Only failures are kept individually, so memory
+# does not depend on the size of the file.
+@dataclass
+class ImportReport:
+    rows: int = 0
+    intervals: int = 0
+    succeeded: int = 0
+    skipped: int = 0
+    failures: list = field(default_factory=list)
+    # The file as a whole could not be read, e.g. a CSV with unknown columns
+    error: str = None
+
+    def addFailure(self, lineNumber, error):
+        self.failures.append((lineNumber, error))
+
+    @property
+    def failed(self):
+        return len(self.failures) + (1 if self.error else 0)
+
+def isCsv(path):
+    return path.lower().endswith('.csv')
+
+# Raise the errors of the file as a whole before any row is read: missing file, unknown CSV columns
+def checkFile(path):
+
+    with open(path, 'r', encoding='utf-8', newline='') as importFile:
+        if isCsv(path):
+            checkColumns(csv.DictReader(importFile).fieldnames)
+
+# Stream the rows of a .csv or .jsonl file one at a time
+def readRows(path):
+
+    with open(path, 'r', encoding='utf-8', newline='') as importFile:
+        if isCsv(path):
+            yield from readCsvRows(importFile)
+        else:
+            yield from readJsonRows(importFile)
+
+def checkColumns(fieldnames):
+
+    unknown = set(fieldnames or []) - set(FIELDS)
+    if unknown:
+        raise ValueError('Unknown columns in import file: ' + ', '.join(sorted(unknown)))
+
+def readCsvRows(importFile):
+
+    reader = csv.DictReader(importFile)
+    checkColumns(reader.fieldnames)
+
+    for values in reader:
+        yield ImportRow(reader.line_num, {key: value for key, value in values.items() if value not in (None, '')})
+
+def readJsonRows(importFile):
+
+    for lineNumber, line in enumerate(importFile, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            values = json.loads(line)
+        except ValueError as e:
+            yield ImportRow(lineNumber, error='Invalid JSON: ' + str(e))
+            continue
+
+        if not isinstance(values, dict):
+            yield ImportRow(lineNumber, error='Expected a JSON object')
+            continue
+
+        unknown = set(values) - set(FIELDS)
+        if unknown:
+            yield ImportRow(lineNumber, error='Unknown fields: ' + ', '.join(sorted(unknown)))
+            continue
+
+        # null is the same as a missing field, as an empty CSV cell
+        values = {key: value for key, value in values.items() if value is not None}
+        wrongTypes = sorted(key for key, value in values.items() if not isinstance(value, FIELD_TYPES.get(key, str)))
+        if wrongTypes:
+            yield ImportRow(lineNumber, error='Fields must be strings: ' + ', '.join(wrongTypes))
+            continue
+
+        yield ImportRow(lineNumber, values)
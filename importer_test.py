@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+import importer
+
+class ImporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as importFile:
+            importFile.write(content)
+        return path
+
+    def test_ReadJsonRows(self):
+
+        path = self.write('rows.jsonl', '{"dates": "2024-02-05", "issueId": "TASK"}\n\nnot json\n[1]\n{"date": "05"}\n'
+                                        '{"dates": 17, "issueId": ["TASK"]}\n{"dates": "05", "wholeWeek": true, "issueId": null}\n')
+        rows = list(importer.readRows(path))
+
+        self.assertEqual([row.lineNumber for row in rows], [1, 3, 4, 5, 6, 7])
+        self.assertEqual(rows[0].values, {'dates': '2024-02-05', 'issueId': 'TASK'})
+        self.assertIsNone(rows[0].error)
+        self.assertTrue(rows[1].error.startswith('Invalid JSON'))
+        self.assertEqual(rows[2].error, 'Expected a JSON object')
+        self.assertEqual(rows[3].error, 'Unknown fields: date')
+        self.assertEqual(rows[4].error, 'Fields must be strings: dates, issueId')
+        self.assertEqual(rows[5].values, {'dates': '05', 'wholeWeek': True})
+
+    def test_ReadCsvRows(self):
+
+        path = self.write('rows.csv', 'dates,issueId,exceptDates\n2024-02-05/2024-02-09,TASK,2024-02-07\n2024-02-12,,\n')
+        rows = list(importer.readRows(path))
+
+        self.assertEqual([row.lineNumber for row in rows], [2, 3])
+        self.assertEqual(rows[0].values, {'dates': '2024-02-05/2024-02-09', 'issueId': 'TASK', 'exceptDates': '2024-02-07'})
+        self.assertEqual(rows[1].values, {'dates': '2024-02-12'})
+
+        with self.assertRaises(ValueError):
+            list(importer.readRows(self.write('bad.csv', 'dates,issue\n')))
+        with self.assertRaises(ValueError):
+            importer.checkFile(os.path.join(self.directory.name, 'bad.csv'))
+        importer.checkFile(path)
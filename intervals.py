@@ -0,0 +1,52 @@
+# Sweep-line operations over half-open (start, end) ranges.
+# Inputs must already be sorted by start; every function makes a single pass
+# and yields its output lazily, so the cost after sorting is linear.
+
+# Merge overlapping ranges. Ranges that only touch (one ends where the next starts)
+# are merged when isMergeable(previous, current) allows it, or always when it is None.
+# onOverlap(previous, current) is called for every real overlap found.
+def coalesce(ranges, isMergeable=None, onOverlap=None):
+
+    current = None
+    for start, end in ranges:
+        if current is not None:
+            if start < current[1]:
+                if onOverlap:
+                    onOverlap(current, (start, end))
+                current = (current[0], max(current[1], end))
+                continue
+
+            if start == current[1] and (isMergeable is None or isMergeable(current, (start, end))):
+                current = (current[0], end)
+                continue
+
+            yield current
+
+        current = (start, end)
+
+    if current is not None:
+        yield current
+
+# Remove from ranges every part covered by exceptions.
+# Both inputs must be sorted and disjoint, e.g. the output of coalesce().
+def subtract(ranges, exceptions):
+
+    exceptions = iter(exceptions)
+    exception = next(exceptions, None)
+
+    for start, end in ranges:
+        while exception is not None and exception[1] <= start:
+            exception = next(exceptions, None)
+
+        cursor = start
+        while exception is not None and exception[0] < end:
+            if exception[0] > cursor:
+                yield (cursor, exception[0])
+            cursor = max(cursor, exception[1])
+            # The exception may still cover part of the next range
+            if exception[1] > end:
+                break
+            exception = next(exceptions, None)
+
+        if cursor < end:
+            yield (cursor, end)
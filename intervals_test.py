@@ -0,0 +1,24 @@
+import unittest
+import intervals
+
+class IntervalsTest(unittest.TestCase):
+
+    def test_Coalesce(self):
+
+        self.assertEqual(list(intervals.coalesce([])), [])
+        self.assertEqual(list(intervals.coalesce([(1, 3), (2, 5), (5, 6), (7, 8)])), [(1, 6), (7, 8)])
+        self.assertEqual(list(intervals.coalesce([(1, 10), (2, 3), (4, 5)])), [(1, 10)])
+
+        overlaps = []
+        merged = intervals.coalesce([(1, 3), (2, 5), (5, 6)], isMergeable=lambda previous, current: False,
+                                    onOverlap=lambda previous, current: overlaps.append((previous, current)))
+        self.assertEqual(list(merged), [(1, 5), (5, 6)])
+        self.assertEqual(overlaps, [((1, 3), (2, 5))])
+
+    def test_Subtract(self):
+
+        self.assertEqual(list(intervals.subtract([(0, 10)], [])), [(0, 10)])
+        self.assertEqual(list(intervals.subtract([(0, 10)], [(0, 10)])), [])
+        self.assertEqual(list(intervals.subtract([(0, 10)], [(-5, 2), (4, 5), (8, 20)])), [(2, 4), (5, 8)])
+        self.assertEqual(list(intervals.subtract([(0, 2), (3, 5), (6, 8)], [(1, 7)])), [(0, 1), (7, 8)])
+        self.assertEqual(list(intervals.subtract([(5, 6)], [(0, 1), (2, 3), (10, 11)])), [(5, 6)])
@@ -0,0 +1,178 @@
+import copy
+import datetime
+import sqlite3
+import threading
+import time
+
+# Local record of every worklog accepted by the tracking server, keyed on
+# (account, issueKey, startTime, endTime). Lets reruns skip intervals already submitted.
+# Time tracked per issue is also totalled per day, ISO week and month as worklogs are recorded,
+# so reports over years of history read a few rows instead of every worklog.
+class Ledger:
+
+    PERIODS = ('day', 'week', 'month')
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS worklog (
+            account TEXT NOT NULL DEFAULT '',
+            issueKey TEXT NOT NULL,
+            startTime TEXT NOT NULL,
+            endTime TEXT NOT NULL,
+            submittedAt REAL NOT NULL,
+            PRIMARY KEY (account, issueKey, startTime, endTime)
+        ) WITHOUT ROWID'''
+
+    TOTALS_SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS worklog_total (
+            account TEXT NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            issueKey TEXT NOT NULL,
+            seconds INTEGER NOT NULL,
+            intervals INTEGER NOT NULL,
+            PRIMARY KEY (account, period, bucket, issueKey)
+        ) WITHOUT ROWID'''
+
+    def __init__(self, path, account=''):
+
+        self.path = path
+        self.account = account
+        self.lock = threading.Lock()
+        # Shared by the submission workers; every access goes through self.lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.migrate()
+            self.connection.execute(self.SCHEMA)
+            if not self.hasTable('worklog_total'):
+                self.connection.execute(self.TOTALS_SCHEMA)
+                self.rebuildTotals()
+
+    # Rows of ledgers created before accounts were recorded are assigned to the account opening it
+    def migrate(self):
+
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(worklog)')]
+        if columns and 'account' not in columns:
+            self.connection.execute('ALTER TABLE worklog RENAME TO worklog_old')
+            self.connection.execute(self.SCHEMA)
+            self.connection.execute('INSERT INTO worklog SELECT ?, issueKey, startTime, endTime, submittedAt FROM worklog_old', (self.account,))
+            self.connection.execute('DROP TABLE worklog_old')
+
+    def hasTable(self, name):
+        return self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    # Totals of ledgers created before they were kept are computed once from every recorded worklog
+    def rebuildTotals(self):
+
+        self.connection.execute('DELETE FROM worklog_total')
+        for account, issueKey, startTime, endTime in self.connection.execute('SELECT account, issueKey, startTime, endTime FROM worklog').fetchall():
+            self.addToTotals(account, issueKey, startTime, endTime)
+
+    # Count a worklog in the totals of its day, week and month: the local day of its start time
+    def addToTotals(self, account, issueKey, startTime, endTime):
+
+        try:
+            start = datetime.datetime.fromisoformat(startTime)
+            seconds = int((datetime.datetime.fromisoformat(endTime) - start).total_seconds())
+        except (TypeError, ValueError):
+            # Not a time interval, nothing to count
+            return
+
+        for period in self.PERIODS:
+            self.connection.execute(
+                'INSERT INTO worklog_total VALUES (?, ?, ?, ?, ?, 1) '
+                'ON CONFLICT (account, period, bucket, issueKey) DO UPDATE SET seconds = seconds + excluded.seconds, intervals = intervals + 1',
+                (account, period, self.bucketOf(period, start.date()), issueKey, seconds))
+
+    # E.g. for 2024-02-05: day 2024-02-05, week 2024-W06, month 2024-02. Buckets of a period sort chronologically.
+    @staticmethod
+    def bucketOf(period, day):
+
+        if period == 'week':
+            year, week, _ = day.isocalendar()
+            return '{}-W{:02d}'.format(year, week)
+        if period == 'month':
+            return day.strftime('%Y-%m')
+        return day.isoformat()
+
+    # View of the same ledger recording for another account. Shares the connection and its lock.
+    def forAccount(self, account):
+
+        view = copy.copy(self)
+        view.account = account
+        return view
+
+    # Return the subset of (issueKey, startTime, endTime) entries already recorded.
+    # Issues a single range scan over the primary key per distinct issue.
+    def findSubmitted(self, entries):
+
+        entries = set(entries)
+        ranges = {}
+        for issueKey, startTime, endTime in entries:
+            low, high = ranges.get(issueKey, (startTime, startTime))
+            ranges[issueKey] = (min(low, startTime), max(high, startTime))
+
+        submitted = set()
+        with self.lock:
+            for issueKey, (low, high) in ranges.items():
+                rows = self.connection.execute(
+                    'SELECT issueKey, startTime, endTime FROM worklog WHERE account = ? AND issueKey = ? AND startTime BETWEEN ? AND ?',
+                    (self.account, issueKey, low, high))
+                submitted.update(row for row in rows if row in entries)
+
+        return submitted
+
+    def record(self, issueKey, startTime, endTime):
+
+        with self.lock, self.connection:
+            inserted = self.connection.execute('INSERT OR IGNORE INTO worklog VALUES (?, ?, ?, ?, ?)',
+                                               (self.account, issueKey, startTime, endTime, time.time())).rowcount
+            if inserted:
+                self.addToTotals(self.account, issueKey, startTime, endTime)
+            else:
+                # Submitted again with --force: counted once
+                self.connection.execute('UPDATE worklog SET submittedAt = ? WHERE account = ? AND issueKey = ? AND startTime = ? AND endTime = ?',
+                                        (time.time(), self.account, issueKey, startTime, endTime))
+
+    # Ranges a caller asked for that were sent merged into a larger worklog, already recorded.
+    # Recorded so that asking for them again is skipped, but not counted in the totals twice.
+    def recordCovered(self, entries):
+
+        submittedAt = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR IGNORE INTO worklog VALUES (?, ?, ?, ?, ?)',
+                                        [(self.account, issueKey, startTime, endTime, submittedAt) for issueKey, startTime, endTime in entries])
+
+    # Tracked time of the account between two days (inclusive, 'YYYY-MM-DD', None for no limit).
+    # Grouped per period ('day', 'week' or 'month') and issue, or with groupBy='issue' per issue only.
+    # Weeks and months containing fromDay or toDay are counted whole.
+    # Returns (bucket, issueKey, seconds, intervals) rows sorted by bucket and issue, bucket being None per issue.
+    def totals(self, groupBy='day', fromDay=None, toDay=None, issueKey=None):
+
+        if groupBy not in self.PERIODS + ('issue',):
+            raise ValueError('Unknown report grouping [{}]. Expected one of: {}'.format(groupBy, ', '.join(self.PERIODS + ('issue',))))
+
+        period = 'day' if groupBy == 'issue' else groupBy
+        query = 'SELECT bucket, issueKey, seconds, intervals FROM worklog_total WHERE account = ? AND period = ?'
+        params = [self.account, period]
+        if fromDay:
+            query += ' AND bucket >= ?'
+            params.append(self.bucketOf(period, datetime.date.fromisoformat(fromDay)))
+        if toDay:
+            query += ' AND bucket <= ?'
+            params.append(self.bucketOf(period, datetime.date.fromisoformat(toDay)))
+        if issueKey:
+            query += ' AND issueKey = ?'
+            params.append(issueKey)
+
+        if groupBy == 'issue':
+            query = 'SELECT NULL, issueKey, SUM(seconds), SUM(intervals) FROM ({}) GROUP BY issueKey ORDER BY issueKey'.format(query)
+        else:
+            query += ' ORDER BY bucket, issueKey'
+
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def close(self):
+
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from ledger import Ledger
+
+class LedgerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledger = Ledger(os.path.join(self.directory.name, 'ledger.db'))
+
+    def tearDown(self):
+        self.ledger.close()
+        self.directory.cleanup()
+
+    def test_FindSubmitted(self):
+
+        self.ledger.record('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')
+        self.ledger.record('TASK', '2024-02-06T09:00:00.000Z', '2024-02-06T17:00:00.000Z')
+        self.ledger.record('OTHER', '2024-02-07T09:00:00.000Z', '2024-02-07T17:00:00.000Z')
+
+        submitted = self.ledger.findSubmitted([
+            ('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z'),
+            ('TASK', '2024-02-07T09:00:00.000Z', '2024-02-07T17:00:00.000Z'),
+            ('OTHER', '2024-02-07T09:00:00.000Z', '2024-02-07T17:00:00.000Z')])
+
+        self.assertEqual(submitted, {
+            ('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z'),
+            ('OTHER', '2024-02-07T09:00:00.000Z', '2024-02-07T17:00:00.000Z')})
+
+    def test_RecordIsIdempotent(self):
+
+        self.ledger.record('TASK', 'a', 'b')
+        self.ledger.record('TASK', 'a', 'b')
+        self.assertEqual(self.ledger.findSubmitted([('TASK', 'a', 'b')]), {('TASK', 'a', 'b')})
+        self.assertEqual(self.ledger.findSubmitted([]), set())
+
+    def test_RecordCoveredIsNotCounted(self):
+
+        self.ledger.record('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')
+        self.ledger.recordCovered([('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T12:00:00.000Z'),
+                                   ('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')])
+
+        self.assertEqual(len(self.ledger.findSubmitted([('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T12:00:00.000Z')])), 1)
+        self.assertEqual(self.ledger.totals('day'), [('2024-02-05', 'TASK', 8 * 3600, 1)])
+
+    def test_AccountsAreSeparate(self):
+
+        alice = self.ledger.forAccount('alice')
+        alice.record('TASK', 'a', 'b')
+        self.assertEqual(alice.findSubmitted([('TASK', 'a', 'b')]), {('TASK', 'a', 'b')})
+        self.assertEqual(self.ledger.forAccount('bob').findSubmitted([('TASK', 'a', 'b')]), set())
+
+    def test_MigratesLedgerWithoutAccounts(self):
+
+        path = os.path.join(self.directory.name, 'old.db')
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute('CREATE TABLE worklog (issueKey TEXT, startTime TEXT, endTime TEXT, submittedAt REAL, PRIMARY KEY (issueKey, startTime, endTime))')
+            connection.execute("INSERT INTO worklog VALUES ('TASK', 'a', 'b', 0)")
+        connection.close()
+
+        ledger = Ledger(path, 'alice')
+        self.assertEqual(ledger.findSubmitted([('TASK', 'a', 'b')]), {('TASK', 'a', 'b')})
+        ledger.close()
+
+    def test_TotalsAreKeptPerPeriod(self):
+
+        self.ledger.record('TASK', '2024-02-05T09:00:00.000+01:00', '2024-02-05T17:00:00.000+01:00')
+        self.ledger.record('TASK', '2024-02-05T18:00:00.000+01:00', '2024-02-05T19:30:00.000+01:00')
+        self.ledger.record('TASK', '2024-02-12T09:00:00.000Z', '2024-02-12T17:00:00.000Z')
+        self.ledger.record('OTHER', '2024-03-01T09:00:00.000Z', '2024-03-01T10:00:00.000Z')
+        # Recorded again: counted once
+        self.ledger.record('OTHER', '2024-03-01T09:00:00.000Z', '2024-03-01T10:00:00.000Z')
+        self.ledger.forAccount('bob').record('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')
+
+        self.assertEqual(self.ledger.totals('day'), [('2024-02-05', 'TASK', 34200, 2), ('2024-02-12', 'TASK', 28800, 1), ('2024-03-01', 'OTHER', 3600, 1)])
+        self.assertEqual(self.ledger.totals('week', '2024-02-07', '2024-02-12'), [('2024-W06', 'TASK', 34200, 2), ('2024-W07', 'TASK', 28800, 1)])
+        self.assertEqual(self.ledger.totals('month'), [('2024-02', 'TASK', 63000, 3), ('2024-03', 'OTHER', 3600, 1)])
+        self.assertEqual(self.ledger.totals('issue', toDay='2024-03-01'), [(None, 'OTHER', 3600, 1), (None, 'TASK', 63000, 3)])
+        self.assertEqual(self.ledger.totals('day', issueKey='OTHER'), [('2024-03-01', 'OTHER', 3600, 1)])
+
+        with self.assertRaises(ValueError):
+            self.ledger.totals('year')
+
+    def test_TotalsAreBuiltForExistingLedgers(self):
+
+        path = os.path.join(self.directory.name, 'old.db')
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute(Ledger.SCHEMA)
+            connection.execute("INSERT INTO worklog VALUES ('alice', 'TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z', 0)")
+        connection.close()
+
+        ledger = Ledger(path, 'alice')
+        self.assertEqual(ledger.totals('month'), [('2024-02', 'TASK', 28800, 1)])
+        ledger.close()
@@ -0,0 +1,114 @@
+import atexit
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+# Logging of the 'tracker' logger.
+# Records are only put on a queue by the thread logging them; a background listener formats
+# them and writes them to the console and to the rotating log file (as JSON lines), so slow
+# disk writes never hold back the submission workers. Secrets are redacted before any output.
+
+LOGGER_NAME = 'tracker'
+LOG_FILE = 'tracker.log'
+FILE_LEVEL = logging.INFO
+
+# Attributes of a LogRecord that are not extra fields given by the caller
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+loggingLock = threading.Lock()
+consoleHandler = None
+listener = None
+
+# Redact passwords and session cookies from a log message
+class RedactingFilter(logging.Filter):
+
+    PATTERNS = [
+        (re.compile(r'(JSESSIONID=|atlassian\.xsrf\.token=)[^;,\s\'"]+'), r'\1****'),
+        (re.compile(r'''(['"]password['"]\s*:\s*)(['"]).*?\2'''), r'\1\2****\2'),
+    ]
+    SECRET_FIELDS = ('password', 'cookie', 'cookies')
+
+    def filter(self, record):
+
+        message = record.getMessage()
+        for pattern, replacement in self.PATTERNS:
+            message = pattern.sub(replacement, message)
+        record.msg = message
+        record.args = None
+
+        for field in self.SECRET_FIELDS:
+            if hasattr(record, field):
+                setattr(record, field, '****')
+
+        return True
+
+# One JSON object per line, with the extra fields given to the logging call (requestId, status, latency...)
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + '.{:03d}'.format(int(record.msecs)),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+# Attach the queue to the 'tracker' logger and start the background writer, once per process,
+# however many Trackers are created. The log file is only opened on the first record.
+def setupLogging():
+
+    global consoleHandler, listener
+    with loggingLock:
+        if consoleHandler is None:
+            redactingFilter = RedactingFilter()
+
+            fileHandler = TimedRotatingFileHandler(filename=LOG_FILE, when='W0', interval=1, backupCount=8, delay=True)
+            fileHandler.setLevel(FILE_LEVEL)
+            fileHandler.setFormatter(JsonFormatter())
+            fileHandler.addFilter(redactingFilter)
+
+            handler = logging.StreamHandler()
+            handler.setLevel(logging.INFO)
+            handler.addFilter(redactingFilter)
+
+            logQueue = queue.SimpleQueue()
+            listener = QueueListener(logQueue, fileHandler, handler, respect_handler_level=True)
+            listener.start()
+            # Write what is still queued when the program ends
+            atexit.register(listener.stop)
+
+            logger = logging.getLogger(LOGGER_NAME)
+            logger.addHandler(QueueHandler(logQueue))
+
+            consoleHandler = handler
+            updateLoggerLevel()
+
+    return consoleHandler
+
+def setConsoleLevel(level):
+
+    handler = setupLogging()
+    handler.setLevel(logging.getLevelName(level) if isinstance(level, str) else level)
+    updateLoggerLevel()
+
+# Records no handler wants are dropped by the logger itself, before being built and queued
+def updateLoggerLevel():
+    logging.getLogger(LOGGER_NAME).setLevel(min(FILE_LEVEL, consoleHandler.level))
+
+# Block until every queued record is written
+def flushLogging():
+
+    with loggingLock:
+        if listener is not None:
+            listener.stop()
+            listener.start()
@@ -0,0 +1,50 @@
+import json
+import logging
+import unittest
+from logging.handlers import QueueHandler
+import logs
+
+class LogsTest(unittest.TestCase):
+
+    def makeRecord(self, message, *args, **extra):
+
+        record = logging.LogRecord('tracker', logging.INFO, __file__, 1, message, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_RedactingFilter(self):
+
+        record = self.makeRecord('headers [%s] body [%s]', {'Cookie': 'JSESSIONID=ABC123; atlassian.xsrf.token=XYZ'},
+                                 {'user': 'me', 'password': 'secret'}, password='secret')
+        self.assertTrue(logs.RedactingFilter().filter(record))
+
+        message = record.getMessage()
+        self.assertNotIn('ABC123', message)
+        self.assertNotIn('XYZ', message)
+        self.assertNotIn('secret', message)
+        self.assertIn("'password': '****'", message)
+        self.assertEqual(record.password, '****')
+
+    def test_JsonFormatter(self):
+
+        record = self.makeRecord('Got response with status code [%d]', 200, requestId='abc', status=200, latencyMs=12.5)
+        entry = json.loads(logs.JsonFormatter().format(record))
+
+        self.assertEqual(entry['message'], 'Got response with status code [200]')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual((entry['requestId'], entry['status'], entry['latencyMs']), ('abc', 200, 12.5))
+        self.assertNotIn('args', entry)
+
+    def test_SetupLoggingUsesQueue(self):
+
+        logs.setupLogging()
+        logs.setupLogging()
+        logger = logging.getLogger('tracker')
+        self.assertEqual(len([handler for handler in logger.handlers if isinstance(handler, QueueHandler)]), 1)
+
+        logs.setConsoleLevel('WARNING')
+        self.assertEqual(logger.level, logging.INFO)
+        logs.setConsoleLevel('DEBUG')
+        self.assertEqual(logger.level, logging.DEBUG)
+        logs.setConsoleLevel('INFO')
+        logs.flushLogging()
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Counters and latency histograms of a run, exported at the end of it
+# as a Prometheus textfile (.prom) or as a JSON summary (any other extension).
+class Metrics:
+
+    # Upper bounds, in seconds, of the latency histogram buckets
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.counters = {}
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.histograms = {}
+
+    def increment(self, name, amount=1, **labels):
+
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.setdefault(key, [0] * (len(self.BUCKETS) + 1) + [0.0])
+            for index, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    histogram[index] += 1
+            histogram[len(self.BUCKETS)] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+
+        startedAt = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - startedAt, **labels)
+
+    # Wrap an iterable, timing how long it takes to produce its items
+    def timedIterator(self, name, iterable, **labels):
+
+        elapsed = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                startedAt = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - startedAt
+                yield item
+        finally:
+            self.observe(name, elapsed, **labels)
+
+    def toPrometheus(self):
+
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append('{}{} {}'.format(name, self.formatLabels(labels), value))
+
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.BUCKETS, histogram):
+                    lines.append('{}_bucket{} {}'.format(name, self.formatLabels(labels + (('le', repr(bound)),)), count))
+                lines.append('{}_bucket{} {}'.format(name, self.formatLabels(labels + (('le', '+Inf'),)), histogram[len(self.BUCKETS)]))
+                lines.append('{}_sum{} {}'.format(name, self.formatLabels(labels), histogram[-1]))
+                lines.append('{}_count{} {}'.format(name, self.formatLabels(labels), histogram[len(self.BUCKETS)]))
+
+        return '\n'.join(lines) + '\n'
+
+    def toJson(self):
+
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': histogram[len(self.BUCKETS)], 'sum': histogram[-1],
+                           'buckets': dict(zip([str(bound) for bound in self.BUCKETS], histogram))}
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+
+        return {'counters': counters, 'histograms': histograms}
+
+    # Written atomically, so a textfile collector never reads half a file
+    def write(self, path):
+
+        content = self.toPrometheus() if path.endswith('.prom') else json.dumps(self.toJson(), indent=2)
+        tempPath = path + '.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as metricsFile:
+            metricsFile.write(content)
+        os.replace(tempPath, path)
+
+    @staticmethod
+    def formatLabels(labels):
+
+        if not labels:
+            return ''
+        return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels) + '}'
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from metrics import Metrics
+
+class MetricsTest(unittest.TestCase):
+
+    def test_CountersAreLabelled(self):
+
+        metrics = Metrics()
+        metrics.increment('tracker_intervals_total', result='succeeded')
+        metrics.increment('tracker_intervals_total', 2, result='succeeded')
+        metrics.increment('tracker_intervals_total', result='failed')
+
+        self.assertEqual(metrics.counters[('tracker_intervals_total', (('result', 'succeeded'),))], 3)
+        self.assertEqual(metrics.counters[('tracker_intervals_total', (('result', 'failed'),))], 1)
+
+    def test_HistogramBuckets(self):
+
+        metrics = Metrics()
+        for seconds in (0.001, 0.02, 0.02, 60):
+            metrics.observe('tracker_request_seconds', seconds, status=200)
+
+        text = metrics.toPrometheus()
+        self.assertIn('tracker_request_seconds_bucket{status="200",le="0.005"} 1', text)
+        self.assertIn('tracker_request_seconds_bucket{status="200",le="0.025"} 3', text)
+        self.assertIn('tracker_request_seconds_bucket{status="200",le="30.0"} 3', text)
+        self.assertIn('tracker_request_seconds_bucket{status="200",le="+Inf"} 4', text)
+        self.assertIn('tracker_request_seconds_count{status="200"} 4', text)
+
+        summary = metrics.toJson()['histograms'][0]
+        self.assertEqual((summary['name'], summary['labels'], summary['count']), ('tracker_request_seconds', {'status': 200}, 4))
+        self.assertAlmostEqual(summary['sum'], 60.041)
+
+    def test_TimedIteratorMeasuresProduction(self):
+
+        metrics = Metrics()
+        self.assertEqual(list(metrics.timedIterator('tracker_parse_seconds', iter([1, 2, 3]))), [1, 2, 3])
+        self.assertEqual(metrics.toJson()['histograms'][0]['count'], 1)
+
+    def test_ConcurrentUpdates(self):
+
+        metrics = Metrics()
+
+        def work():
+            for _ in range(1000):
+                metrics.increment('hits')
+                metrics.observe('latency', 0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.counters[('hits', ())], 4000)
+        self.assertEqual(metrics.toJson()['histograms'][0]['count'], 4000)
+
+    def test_WriteByExtension(self):
+
+        metrics = Metrics()
+        metrics.increment('tracker_intervals_total', result='succeeded')
+
+        with tempfile.TemporaryDirectory() as directory:
+            promPath = os.path.join(directory, 'run.prom')
+            jsonPath = os.path.join(directory, 'run.json')
+            metrics.write(promPath)
+            metrics.write(jsonPath)
+
+            with open(promPath) as promFile:
+                self.assertEqual(promFile.read(), 'tracker_intervals_total{result="succeeded"} 1\n')
+            with open(jsonPath) as jsonFile:
+                self.assertEqual(json.load(jsonFile)['counters'][0]['value'], 1)
+            self.assertEqual(sorted(os.listdir(directory)), ['run.json', 'run.prom'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import cProfile
+import pstats
+import sys
+import threading
+
+# cProfile of a whole run. A cProfile.Profile only sees the thread that enabled it, so
+# the submission workers each get their own profile through runcall(), and every profile
+# is merged into the same stats when the run stops.
+class RunProfiler:
+
+    def __init__(self):
+
+        self.profile = cProfile.Profile()
+        self.workerProfiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.profile.enable()
+
+    # Run func(*args) in a worker thread, profiled in that thread's own profile
+    def runcall(self, func, *args):
+
+        profile = getattr(self.local, 'profile', None)
+        if profile is None:
+            profile = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.workerProfiles.append(profile)
+
+        return profile.runcall(func, *args)
+
+    # Stop profiling, dump the merged stats to path (readable with pstats or snakeviz)
+    # and print the `limit` most expensive functions by cumulative time
+    def stop(self, path, limit=25, stream=None):
+
+        self.profile.disable()
+
+        stats = pstats.Stats(self.profile, stream=stream or sys.stderr)
+        with self.lock:
+            for profile in self.workerProfiles:
+                stats.add(profile)
+
+        stats.dump_stats(path)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stats
@@ -0,0 +1,28 @@
+import os
+import tempfile
+import threading
+import unittest
+from profiling import RunProfiler
+
+class RunProfilerTest(unittest.TestCase):
+
+    def test_RunProfilerMergesWorkerThreads(self):
+
+        def workerTask():
+            return sum(range(1000))
+
+        profiler = RunProfiler()
+        profiler.start()
+        thread = threading.Thread(target=profiler.runcall, args=(workerTask,))
+        thread.start()
+        thread.join()
+
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+            path = os.path.join(directory, 'run.prof')
+            stats = profiler.stop(path, stream=devnull)
+            self.assertTrue(os.path.exists(path))
+
+        self.assertTrue(any(function[2] == 'workerTask' for function in stats.stats))
+
+if __name__ == '__main__':
+    unittest.main()
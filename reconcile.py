@@ -0,0 +1,40 @@
+import intervals
+
+# Worklogs already on the server, indexed by day and issue, so an interval to track is only
+# compared with the worklogs of its own day. Ranges are (start, end) epoch seconds and
+# dayOf(epoch) gives the day, in the user's timezone, a time belongs to.
+class WorklogIndex:
+
+    def __init__(self, dayOf):
+
+        self.dayOf = dayOf
+        # day -> {issueKey: [ranges]}
+        self.days = {}
+        self.count = 0
+
+    def add(self, issueKey, start, end):
+
+        if start >= end:
+            return
+
+        # A worklog crossing midnight belongs to every day it touches
+        for day in range(self.dayOf(start), self.dayOf(end - 1) + 1):
+            self.days.setdefault(day, {}).setdefault(issueKey, []).append((start, end))
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    # Split the range to track into the parts missing on the server and the parts that
+    # collide with worklogs of other issues. Parts already logged on issueKey are dropped.
+    def diff(self, issueKey, dateRange):
+
+        worklogs = self.days.get(self.dayOf(dateRange[0]), {})
+        tracked = list(intervals.coalesce(sorted(worklogs.get(issueKey, []))))
+        others = list(intervals.coalesce(sorted(dateRange for key, ranges in worklogs.items() if key != issueKey for dateRange in ranges)))
+
+        untracked = list(intervals.subtract([dateRange], tracked))
+        missing = list(intervals.subtract(untracked, others))
+        conflicts = list(intervals.subtract(untracked, missing))
+
+        return missing, conflicts
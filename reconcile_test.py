@@ -0,0 +1,40 @@
+import unittest
+from reconcile import WorklogIndex
+
+class WorklogIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        # Days of 100 seconds keep the ranges readable
+        self.index = WorklogIndex(lambda epoch: epoch // 100)
+
+    def test_DiffDropsTrackedParts(self):
+
+        self.index.add('TASK', 110, 130)
+        self.index.add('TASK', 150, 160)
+
+        self.assertEqual(self.index.diff('TASK', (100, 180)), ([(100, 110), (130, 150), (160, 180)], []))
+        self.assertEqual(self.index.diff('TASK', (110, 130)), ([], []))
+
+    def test_DiffReportsOtherIssuesAsConflicts(self):
+
+        self.index.add('TASK', 100, 120)
+        self.index.add('OTHER', 140, 160)
+
+        self.assertEqual(self.index.diff('TASK', (100, 180)), ([(120, 140), (160, 180)], [(140, 160)]))
+
+    def test_DiffOnlyLooksAtTheSameDay(self):
+
+        self.index.add('TASK', 200, 280)
+
+        self.assertEqual(self.index.diff('TASK', (100, 180)), ([(100, 180)], []))
+        self.assertEqual(len(self.index), 1)
+
+    def test_WorklogsCrossingMidnight(self):
+
+        self.index.add('TASK', 150, 250)
+
+        self.assertEqual(self.index.diff('TASK', (200, 280)), ([(250, 280)], []))
+        self.assertEqual(self.index.diff('TASK', (100, 180)), ([(100, 150)], []))
+
+if __name__ == '__main__':
+    unittest.main()
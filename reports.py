@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, asdict
+
+FORMATS = ('table', 'csv', 'json')
+
+# Time tracked on an issue in a period (a day, ISO week or month, None when grouped per issue)
+@dataclass
+class ReportRow:
+    period: str
+    issueKey: str
+    seconds: int
+    hours: float
+    intervals: int
+
+# Build the rows of Ledger.totals() results
+def toReportRows(totals):
+    return [ReportRow(bucket, issueKey, seconds, round(seconds / 3600, 2), intervals) for bucket, issueKey, seconds, intervals in totals]
+
+def formatReport(rows, format='table'):
+
+    if format == 'json':
+        return json.dumps([asdict(row) for row in rows], indent=2)
+
+    if format == 'csv':
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerow(['period', 'issueKey', 'hours', 'intervals'])
+        writer.writerows([row.period or '', row.issueKey, '{:.2f}'.format(row.hours), row.intervals] for row in rows)
+        return output.getvalue()
+
+    if format != 'table':
+        raise ValueError('Unknown report format [{}]. Expected one of: {}'.format(format, ', '.join(FORMATS)))
+
+    lines = ['{:<12} {:<20} {:>9} {:>10}'.format('PERIOD', 'ISSUE', 'HOURS', 'INTERVALS')]
+    lines += ['{:<12} {:<20} {:>9.2f} {:>10}'.format(row.period or '-', row.issueKey, row.hours, row.intervals) for row in rows]
+    lines.append('{:<12} {:<20} {:>9.2f} {:>10}'.format('TOTAL', '', sum(row.seconds for row in rows) / 3600, sum(row.intervals for row in rows)))
+    return '\n'.join(lines)
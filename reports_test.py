@@ -0,0 +1,30 @@
+import json
+import unittest
+import reports
+
+class ReportsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = reports.toReportRows([('2024-W06', 'TASK', 34200, 2), ('2024-W07', 'OTHER', 1800, 1)])
+
+    def test_ToReportRows(self):
+
+        self.assertEqual(self.rows[0], reports.ReportRow('2024-W06', 'TASK', 34200, 9.5, 2))
+
+    def test_FormatTable(self):
+
+        lines = reports.formatReport(self.rows).splitlines()
+        self.assertEqual(lines[1].split(), ['2024-W06', 'TASK', '9.50', '2'])
+        self.assertEqual(lines[-1].split(), ['TOTAL', '10.00', '3'])
+
+    def test_FormatCsvAndJson(self):
+
+        self.assertEqual(reports.formatReport(self.rows, 'csv'), 'period,issueKey,hours,intervals\n2024-W06,TASK,9.50,2\n2024-W07,OTHER,0.50,1\n')
+        self.assertEqual(json.loads(reports.formatReport(self.rows, 'json'))[1],
+                         {'period': '2024-W07', 'issueKey': 'OTHER', 'seconds': 1800, 'hours': 0.5, 'intervals': 1})
+
+        with self.assertRaises(ValueError):
+            reports.formatReport(self.rows, 'xml')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+
+# When and how long to wait before retrying a tracking request.
+# Delays grow exponentially with "full jitter" (a random delay up to the exponential cap),
+# so workers retrying together do not hit the server in lockstep.
+# A Retry-After header sent by the server always takes precedence: when it asks for longer than
+# maxDelay, the request is not retried rather than retried before the server is ready.
+class RetryPolicy:
+
+    RETRYABLE_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, maxAttempts=5, baseDelay=0.5, maxDelay=30.0):
+
+        self.maxAttempts = max(1, int(maxAttempts))
+        self.baseDelay = float(baseDelay)
+        self.maxDelay = float(maxDelay)
+
+    def isRetryable(self, status):
+        return status in self.RETRYABLE_STATUSES
+
+    # attempt is the number of attempts already made, starting at 1
+    def canRetry(self, attempt):
+        return attempt < self.maxAttempts
+
+    # Seconds to wait before the next attempt, None when the server asks for more than maxDelay
+    def delay(self, attempt, retryAfter=None):
+
+        serverDelay = self.parseRetryAfter(retryAfter)
+        if serverDelay is not None:
+            return serverDelay if serverDelay <= self.maxDelay else None
+
+        return random.uniform(0, min(self.maxDelay, self.baseDelay * 2 ** (attempt - 1)))
+
+    # Retry-After is either a number of seconds or an HTTP date
+    @staticmethod
+    def parseRetryAfter(retryAfter):
+
+        if not retryAfter:
+            return None
+
+        try:
+            return max(0.0, float(retryAfter))
+        except ValueError:
+            pass
+
+        # Rarely needed and slow to import
+        import email.utils
+        try:
+            retryAt = email.utils.parsedate_to_datetime(retryAfter)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retryAt.timestamp() - time.time())
+
+# Caps the request rate shared by all submission workers to `rate` requests per second,
+# allowing bursts of up to `burst` requests. A rate of 0 disables the limit.
+class TokenBucket:
+
+    def __init__(self, rate=0, burst=None):
+
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updatedAt = time.monotonic()
+        # Nobody may send before this time, e.g. after the server answered 429
+        self.pausedUntil = 0.0
+        self.lock = threading.Lock()
+
+    # Block until a request may be sent
+    def acquire(self):
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.pausedUntil - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updatedAt) * self.rate)
+                    self.updatedAt = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    # Hold every worker back, used when the server signals it is throttling us
+    def pauseFor(self, seconds):
+
+        with self.lock:
+            self.pausedUntil = max(self.pausedUntil, time.monotonic() + seconds)
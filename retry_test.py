@@ -0,0 +1,56 @@
+import email.utils
+import time
+import unittest
+from unittest import mock
+from retry import RetryPolicy, TokenBucket
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_Delay(self):
+
+        policy = RetryPolicy(maxAttempts=3, baseDelay=1, maxDelay=3)
+        with mock.patch('retry.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([policy.delay(attempt) for attempt in (1, 2, 3, 4)], [1, 2, 3, 3])
+
+        self.assertEqual(policy.delay(1, '2'), 2)
+        self.assertEqual(policy.delay(1, '3'), 3)
+        self.assertIsNone(policy.delay(1, '120'))
+        self.assertTrue(0 <= policy.delay(1) <= 1)
+
+        self.assertTrue(policy.canRetry(2))
+        self.assertFalse(policy.canRetry(3))
+        self.assertTrue(policy.isRetryable(429))
+        self.assertFalse(policy.isRetryable(500))
+
+    def test_ParseRetryAfter(self):
+
+        self.assertIsNone(RetryPolicy.parseRetryAfter(None))
+        self.assertIsNone(RetryPolicy.parseRetryAfter('soon'))
+        self.assertEqual(RetryPolicy.parseRetryAfter('-1'), 0)
+        retryAt = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertTrue(55 < RetryPolicy.parseRetryAfter(retryAt) <= 60)
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_Acquire(self):
+
+        bucket = TokenBucket(rate=100, burst=2)
+        startedAt = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        # Two requests in the burst, then one every 10ms
+        self.assertGreaterEqual(time.monotonic() - startedAt, 0.015)
+
+    def test_Unlimited(self):
+
+        bucket = TokenBucket()
+        for _ in range(1000):
+            bucket.acquire()
+
+    def test_PauseFor(self):
+
+        bucket = TokenBucket()
+        bucket.pauseFor(0.05)
+        startedAt = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - startedAt, 0.04)
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no locking between processes, a single flusher must be run at a time
+    fcntl = None
+
+# Durable queue of worklogs waiting to be sent, so tracking never depends on the server being up.
+# Entries are appended as JSON lines and fsynced before append() returns (write-ahead).
+# A checkpoint file holds the offset of the first entry not settled yet: it only moves forward
+# once every entry before it was sent or rejected by the server, so a crash or an outage at any point
+# leaves the entries to send in the spool. Sending an entry twice is prevented by the ledger.
+class Spool:
+
+    DEFAULT_FLUSH_TIMEOUT = 600
+
+    # flushTimeout is how long a background flush keeps retrying before leaving the rest to the next one
+    def __init__(self, path, flushTimeout=DEFAULT_FLUSH_TIMEOUT):
+
+        self.path = path
+        self.flushTimeout = float(flushTimeout)
+        self.checkpointPath = path + '.checkpoint'
+        # Entries that failed for good, kept for the user to look at
+        self.failedPath = path + '.failed'
+        self.lockPath = path + '.lock'
+        self.lock = threading.Lock()
+
+    def append(self, entries):
+        self.write(self.path, entries)
+
+    def deadLetter(self, entries):
+        self.write(self.failedPath, entries)
+
+    def write(self, path, entries):
+
+        if not entries:
+            return
+
+        data = ''.join(json.dumps(entry, sort_keys=True) + '\n' for entry in entries).encode('utf-8')
+        isNew = not os.path.exists(path)
+        with self.lock, open(path, 'ab') as spoolFile:
+            self.lockFile(spoolFile)
+            spoolFile.write(data)
+            spoolFile.flush()
+            os.fsync(spoolFile.fileno())
+
+        if isNew:
+            self.syncDirectory()
+
+    # Up to `limit` complete entries after the checkpoint, and the offset right after the last one.
+    # A line cut short by a crash while appending is left out.
+    def readPending(self, limit):
+
+        offset = self.readCheckpoint()
+        entries = []
+        try:
+            with open(self.path, 'rb') as spoolFile:
+                spoolFile.seek(offset)
+                for line in spoolFile:
+                    if not line.endswith(b'\n') or len(entries) >= limit:
+                        break
+                    offset += len(line)
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # Not recoverable, skipped so it does not block the entries after it
+                        self.deadLetter([{'corrupted': line.decode('utf-8', 'replace')}])
+        except FileNotFoundError:
+            pass
+
+        return entries, offset
+
+    def hasPending(self):
+
+        try:
+            return os.path.getsize(self.path) > self.readCheckpoint()
+        except FileNotFoundError:
+            return False
+
+    def readCheckpoint(self):
+
+        try:
+            with open(self.checkpointPath, 'r', encoding='utf-8') as checkpointFile:
+                return int(checkpointFile.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    # Atomically record that every entry before offset is settled
+    def commit(self, offset):
+
+        tempPath = self.checkpointPath + '.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as checkpointFile:
+            checkpointFile.write(str(offset))
+            checkpointFile.flush()
+            os.fsync(checkpointFile.fileno())
+        os.replace(tempPath, self.checkpointPath)
+        self.syncDirectory()
+
+    # Empty the spool once everything in it is settled, unless entries were appended meanwhile.
+    # The checkpoint is reset before truncating: a crash in between only sends settled entries again,
+    # which the ledger skips, while the other order would leave the checkpoint past the end of the file.
+    def compact(self):
+
+        try:
+            with self.lock, open(self.path, 'r+b') as spoolFile:
+                self.lockFile(spoolFile)
+                if os.fstat(spoolFile.fileno()).st_size <= self.readCheckpoint():
+                    self.commit(0)
+                    spoolFile.truncate(0)
+                    os.fsync(spoolFile.fileno())
+        except FileNotFoundError:
+            pass
+
+    # Yields whether this process is the one flushing: only one may at a time
+    @contextmanager
+    def flushing(self):
+
+        if fcntl is None:
+            yield True
+            return
+
+        with open(self.lockPath, 'a') as lockFile:
+            try:
+                fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+    # Held until the file is closed. Keeps appends of other processes from interleaving with a compaction.
+    @staticmethod
+    def lockFile(openFile):
+
+        if fcntl is not None:
+            fcntl.flock(openFile, fcntl.LOCK_EX)
+
+    def syncDirectory(self):
+
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from spool import Spool
+
+class SpoolTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool = Spool(os.path.join(self.directory.name, 'tracker.spool'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ReadPendingAfterCheckpoint(self):
+
+        self.assertEqual(self.spool.readPending(10), ([], 0))
+        self.assertFalse(self.spool.hasPending())
+
+        self.spool.append([{'n': 1}, {'n': 2}, {'n': 3}])
+        entries, offset = self.spool.readPending(2)
+        self.assertEqual(entries, [{'n': 1}, {'n': 2}])
+
+        self.spool.commit(offset)
+        self.assertEqual(self.spool.readPending(10)[0], [{'n': 3}])
+
+        # Reopened, as after a crash
+        reopened = Spool(self.spool.path)
+        self.assertEqual(reopened.readPending(10)[0], [{'n': 3}])
+        self.assertTrue(reopened.hasPending())
+
+    def test_TornAndCorruptedLines(self):
+
+        self.spool.append([{'n': 1}])
+        with open(self.spool.path, 'ab') as spoolFile:
+            spoolFile.write(b'not json\n{"n": 2}\n{"n": 3')
+
+        entries, offset = self.spool.readPending(10)
+        self.assertEqual(entries, [{'n': 1}, {'n': 2}])
+        self.assertEqual(offset, os.path.getsize(self.spool.path) - len(b'{"n": 3'))
+        with open(self.spool.failedPath) as failedFile:
+            self.assertIn('not json', failedFile.read())
+
+    def test_CompactOnlyWhenSettled(self):
+
+        self.spool.append([{'n': 1}, {'n': 2}])
+        entries, offset = self.spool.readPending(1)
+        self.spool.commit(offset)
+        self.spool.compact()
+        self.assertEqual(self.spool.readPending(10)[0], [{'n': 2}])
+
+        self.spool.commit(self.spool.readPending(10)[1])
+        self.spool.compact()
+        self.assertEqual((os.path.getsize(self.spool.path), self.spool.readCheckpoint()), (0, 0))
+        self.assertFalse(self.spool.hasPending())
+
+    def test_CrashWhileCompactingLosesNothing(self):
+
+        class CrashingSpool(Spool):
+            def commit(self, offset):
+                super().commit(offset)
+                if offset == 0:
+                    raise KeyboardInterrupt('crash')
+
+        spool = CrashingSpool(self.spool.path)
+        spool.append([{'n': 1}])
+        spool.commit(spool.readPending(10)[1])
+        with self.assertRaises(KeyboardInterrupt):
+            spool.compact()
+
+        # Settled entries are read again, the ledger keeps them from being sent twice
+        self.spool.append([{'n': 2}])
+        self.assertTrue(self.spool.hasPending())
+        self.assertEqual(self.spool.readPending(10)[0], [{'n': 1}, {'n': 2}])
+
+    def test_OneFlusherAtATime(self):
+
+        with self.spool.flushing() as isFlusher:
+            self.assertTrue(isFlusher)
+            with Spool(self.spool.path).flushing() as isOtherFlusher:
+                self.assertFalse(isOtherFlusher)
+
+        with self.spool.flushing() as isFlusher:
+            self.assertTrue(isFlusher)
+
+if __name__ == '__main__':
+    unittest.main()
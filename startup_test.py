@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Startup budget of the command line tool, measured with python -X importtime.
+# Only the standard library should be imported until a command really needs more.
+class StartupTest(unittest.TestCase):
+
+    # Cumulative import time allowed for tracktime, in microseconds
+    TRACKTIME_IMPORT_BUDGET = 50000
+    HEAVY_MODULES = ('requests', 'urllib3', 'jproperties', 'numpy')
+
+    def importTimes(self, *args):
+
+        directory = os.path.dirname(os.path.abspath(__file__))
+        process = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=directory, capture_output=True, text=True, check=True)
+
+        times = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+
+        return times
+
+    def assertNoHeavyImports(self, times):
+
+        for module in self.HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_TracktimeImportBudget(self):
+
+        times = self.importTimes('-c', 'import tracktime')
+        self.assertLess(times['tracktime'], self.TRACKTIME_IMPORT_BUDGET)
+        self.assertNotIn('tracker', times)
+        self.assertNoHeavyImports(times)
+
+    def test_HelpDoesNotImportTracker(self):
+
+        times = self.importTimes('tracktime.py', '--help')
+        self.assertNotIn('tracker', times)
+        self.assertNoHeavyImports(times)
+
+    def test_TrackerImportIsLazy(self):
+
+        times = self.importTimes('-c', 'import tracker; tracker.Tracker("user", "pass", "https://test.com", "https://test.com", "09:00", "17:00", "TASK")')
+        self.assertNoHeavyImports(times)
@@ -0,0 +1,176 @@
+import json
+import re
+import urllib.parse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process stand-in for the tracking server, for tests and benchmarks.
+# POST /auth answers with a session cookie, POST /track stores the worklog after
+# `latency` seconds, failing with `errorStatus` for a share `errorRate` of the requests.
+# GET /worklogs lists the stored worklogs whose day is between `from` and `to`, in pages
+# of at most `maxPageSize`, as {"total": N, "worklogs": [...]}.
+# GET /search answers a JQL `key in ("A","B")` query with the known `issues` ({key: status category}).
+class StubServer:
+
+    SESSION_ID = 'STUBSESSION'
+
+    def __init__(self, latency=0.0, errorRate=0.0, errorStatus=503):
+
+        self.latency = latency
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        self.worklogs = []
+        self.maxPageSize = 50
+        self.issues = {}
+        self.requestCount = 0
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.buildHandler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    @property
+    def authUrl(self):
+        return self.url + '/auth'
+
+    @property
+    def trackingUrl(self):
+        return self.url + '/track'
+
+    @property
+    def worklogUrl(self):
+        return self.url + '/worklogs'
+
+    @property
+    def searchUrl(self):
+        return self.url + '/search'
+
+    def start(self):
+
+        self.thread.start()
+        return self
+
+    def stop(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def buildHandler(self):
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately: without this, Nagle's algorithm
+            # and delayed ACKs add ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stub.lock:
+                    stub.requestCount += 1
+
+                if self.path == '/auth':
+                    self.reply(200, {}, {'Set-Cookie': 'JSESSIONID={}; Path=/; HttpOnly'.format(stub.SESSION_ID)})
+                elif self.path == '/track':
+                    stub.track(self, json.loads(body or b'{}'))
+                else:
+                    self.reply(404, {'error': 'Not found'})
+
+            def do_GET(self):
+
+                with stub.lock:
+                    stub.requestCount += 1
+
+                url = urllib.parse.urlsplit(self.path)
+                if url.path == '/worklogs':
+                    stub.listWorklogs(self, dict(urllib.parse.parse_qsl(url.query)))
+                elif url.path == '/search':
+                    stub.searchIssues(self, dict(urllib.parse.parse_qsl(url.query)))
+                else:
+                    self.reply(404, {'error': 'Not found'})
+
+            def reply(self, status, payload, headers=None):
+
+                content = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def track(self, handler, worklog):
+
+        if self.sessionFromCookies(handler.headers.get('Cookie', '')) != self.SESSION_ID:
+            handler.reply(401, {'error': 'Not authenticated'})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if random.random() < self.errorRate:
+            handler.reply(self.errorStatus, {'error': 'Injected failure'})
+            return
+
+        with self.lock:
+            self.worklogs.append(worklog)
+        handler.reply(200, worklog)
+
+    def listWorklogs(self, handler, params):
+
+        if self.sessionFromCookies(handler.headers.get('Cookie', '')) != self.SESSION_ID:
+            handler.reply(401, {'error': 'Not authenticated'})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        fromDay = params.get('from', '')
+        toDay = params.get('to', '9999-12-31')
+        startAt = int(params.get('startAt', 0))
+        pageSize = min(int(params.get('maxResults', self.maxPageSize)), self.maxPageSize)
+
+        with self.lock:
+            matching = [worklog for worklog in self.worklogs if fromDay <= worklog['startTime'][:10] <= toDay]
+        handler.reply(200, {'total': len(matching), 'worklogs': matching[startAt:startAt + pageSize]})
+
+    def searchIssues(self, handler, params):
+
+        if self.sessionFromCookies(handler.headers.get('Cookie', '')) != self.SESSION_ID:
+            handler.reply(401, {'error': 'Not authenticated'})
+            return
+
+        keys = re.findall(r'"([^"]+)"', params.get('jql', ''))
+        issues = [{'key': key, 'fields': {'status': {'name': category.title(), 'statusCategory': {'key': category}}}}
+                  for key, category in self.issues.items() if key in keys]
+        handler.reply(200, {'total': len(issues), 'issues': issues})
+
+    @staticmethod
+    def sessionFromCookies(cookies):
+
+        for cookie in cookies.split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == 'JSESSIONID':
+                return value
+        return None
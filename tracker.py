@@ -1,23 +1,141 @@
-from jproperties import Properties
-import requests
+from transport import Transport
+import calendars
+from cache import FileCache
+from ledger import Ledger
+from spool import Spool
+from retry import RetryPolicy, TokenBucket
+from logs import setupLogging, setConsoleLevel
+from metrics import Metrics
+import importer
+import reports
+from reconcile import WorklogIndex
+import intervals
 import datetime
+import heapq
 import re
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import threading
+import time
+import uuid
+import zoneinfo
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import chain, islice
 from dataclasses import dataclass
 
+NOT_LOADED = object()
+numpy = NOT_LOADED
+
+# numpy is only imported the first time a date range is expanded. None when it is not installed.
+def loadNumpy():
+
+    global numpy
+    if numpy is NOT_LOADED:
+        try:
+            import numpy as numpyModule
+        except ImportError:
+            numpyModule = None
+        numpy = numpyModule
+
+    return numpy
+
 class Tracker:
 
     JSESSION_ID_KEY = 'JSESSIONID='
     ATLASSIAN_KEY = 'atlassian.xsrf.token='
     CONFIG_PATH='./tracker.conf'
+    SESSION_CACHE_PATH = './.tracker.session'
+    DEFAULT_SESSION_TTL = 1800
+    LEDGER_PATH = './tracker.ledger.db'
+    LEDGER_BATCH_SIZE = 500
+    SPOOL_PATH = './tracker.spool'
+    AUTH_FAILURE_STATUSES = (401, 403)
+    WORKLOG_PAGE_SIZE = 100
+    ISSUE_BATCH_SIZE = 50
+    ISSUE_CACHE_PATH = './.tracker.issues'
+    DEFAULT_ISSUE_CACHE_TTL = 3600
+    # Settings of the resources every profile shares, which cannot be overridden per profile
+    SHARED_CONFIG_KEYS = ('http.pool.size', 'http.connect.timeout', 'http.read.timeout', 'session.cache', 'session.ttl',
+                          'ledger.path', 'issue.cache', 'issue.cache.ttl', 'metrics.file', 'daemon.port', 'daemon.batch-window')
 
-    @dataclass
+    EPOCH_DATE = datetime.date(1970, 1, 1)
+    EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+
+    # Interval kept as integer epoch seconds plus the UTC offset of the user's timezone.
+    # The ISO strings sent to the server are only built when a request body is serialized.
+    # ISO strings are also accepted on construction.
     class TrackInterval:
-        start: str
-        end: str
 
-    def __init__(self, user, password, trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored = True, logLevel='INFO'):
+        __slots__ = ('start', 'end', 'offset')
+
+        def __init__(self, start, end, offset=None):
+
+            if isinstance(start, str):
+                start, parsedOffset = self.parseIso(start)
+                offset = parsedOffset if offset is None else offset
+            if isinstance(end, str):
+                end, _ = self.parseIso(end)
+
+            self.start = start
+            self.end = end
+            self.offset = offset or 0
+
+        @property
+        def startIso(self):
+            return self.formatIso(self.start, self.offset)
+
+        @property
+        def endIso(self):
+            return self.formatIso(self.end, self.offset)
+
+        def sortKey(self):
+            return (self.start, self.end)
+
+        @staticmethod
+        def parseIso(value):
+
+            parsed = datetime.datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+            return int(parsed.timestamp()), int(parsed.utcoffset().total_seconds())
+
+        @staticmethod
+        def formatIso(epoch, offset):
+
+            localTime = Tracker.EPOCH_DATETIME + datetime.timedelta(seconds=epoch + offset)
+            if offset == 0:
+                suffix = 'Z'
+            else:
+                sign = '+' if offset > 0 else '-'
+                suffix = '{}{:02d}:{:02d}'.format(sign, abs(offset) // 3600, abs(offset) % 3600 // 60)
+            return localTime.strftime('%Y-%m-%dT%H:%M:%S') + '.000' + suffix
+
+        def __eq__(self, other):
+
+            if not isinstance(other, Tracker.TrackInterval):
+                return NotImplemented
+            return (self.start, self.end, self.offset) == (other.start, other.end, other.offset)
+
+        def __hash__(self):
+            return hash((self.start, self.end, self.offset))
+
+        def __repr__(self):
+            return 'TrackInterval(start={!r}, end={!r})'.format(self.startIso, self.endIso)
+
+    # Outcome of a single tracking request, as reported by execute()
+    @dataclass
+    class TrackResult:
+        interval: 'Tracker.TrackInterval'
+        issueId: str
+        succeeded: bool
+        status: int = None
+        latency: float = 0.0
+        error: str = None
+        lineNumber: int = None
+
+    def __init__(self, user, password, trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored = True, logLevel='INFO',
+                 maxWorkers=4, transport=None, sessionCache=None, ledger=None,
+                 holidays=None, timezone='UTC', retryPolicy=None, rateLimiter=None, metrics=None, metricsFile=None,
+                 worklogUrl=None, spool=None, issueSearchUrl=None, issueCache=None):
         
         self.user = user
         self.password = password
@@ -27,50 +145,193 @@ class Tracker:
         self.defaultEndTime = defaultEndTime
         self.defaultIssueId = defaultIssueId
         self.isWeekendIgnored = isWeekendIgnored
+        self.maxWorkers = max(1, int(maxWorkers))
+        self.transport = transport if transport else Transport(poolSize=max(Transport.DEFAULT_POOL_SIZE, self.maxWorkers))
+        self.cookies = ''
+        self.sessionCache = sessionCache
+        self.authLock = threading.Lock()
+        self.ledger = ledger.forAccount(user) if ledger else None
+        # Dates skipped in date ranges, in addition to weekends
+        self.holidays = frozenset(holidays or [])
+        # Times are interpreted as wall clock times in this timezone
+        self.timezone = self.toTimezone(timezone)
+        self.retryPolicy = retryPolicy if retryPolicy else RetryPolicy()
+        self.rateLimiter = rateLimiter if rateLimiter else TokenBucket()
+        # Counters and latencies of the run, written to metricsFile by writeMetrics()
+        self.metrics = metrics if metrics else Metrics()
+        self.metricsFile = metricsFile
+        # Set to a profiling.RunProfiler to profile the submission workers too
+        self.profiler = None
+        # Lists the worklogs already on the server, for reconciliation
+        self.worklogUrl = worklogUrl
+        # Worklogs queued by spoolIntervals(), sent by flushSpool()
+        self.spool = spool
+        # Issue keys are checked there before anything is submitted, the answers are kept in issueCache
+        self.issueSearchUrl = issueSearchUrl
+        self.issueCache = issueCache
 
         self.initDateFields()
 
         self.logging = logging.getLogger('tracker')
-        fileHandler = TimedRotatingFileHandler(filename='tracker.log', when='W0', interval=1, backupCount=8)
-        fileHandler.setLevel(logging.INFO)
-        fileHandler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-
-        self.consoleHandler = logging.StreamHandler()
-        self.consoleHandler.setLevel(logging.getLevelName(logLevel))
-
-        self.logging.addHandler(fileHandler)
-        self.logging.addHandler(self.consoleHandler)
-
-        # Will accept and pass every message to the handlers
-        # Let the handlers filter the messages they need
-        self.logging.setLevel(1)
+        self.consoleHandler = setupLogging()
+        setConsoleLevel(logLevel)
 
         self.logging.debug('Object constructed with params: ' +
                            'user [%s] password [%s] trackingUrl [%s] authUrl [%s] defaultStartTime [%s] defaultEndTime [%s] ' +
-                           'defaultIssueId [%s] isWeekendIgnored [%s] logLevel [%s]',
-                           user, password, trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored, logLevel)
+                           'defaultIssueId [%s] isWeekendIgnored [%s] logLevel [%s] maxWorkers [%s]',
+                           user, '****', trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored, logLevel,
+                           self.maxWorkers)
 
 
     @classmethod
-    def fromConfigFile(cls):
+    def fromConfigFile(cls, profile=None):
+        return cls.fromConfig(cls.loadConfigFile(), profile)
+
+    @classmethod
+    def loadConfigFile(cls):
+        from jproperties import Properties
+
         configs = Properties()
         with open(cls.CONFIG_PATH, 'rb') as configFile:
             configs.load(configFile, 'utf-8')
 
-        user = configs.get('user').data
-        password = configs.get('password').data
-        trackingUrl = configs.get('tracking.url').data
-        authUrl = configs.get('auth.url').data
-        defaultStartTime = configs.get('default.start.time').data
-        defaultEndTime = configs.get('default.end.time').data
-        defaultIssueId = configs.get('default-issue-id').data
-        isWeekendIgnored = cls.toBool(configs.get('ignore-weekends').data)
-        logLevel = configs.get('log-level').data
-
-        return cls(user, password, trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored, logLevel)
+        return configs
+
+    # Build a Tracker for one profile of the config file. Settings of 'profile.<name>.<key>'
+    # override the global '<key>' ones. Resources not given are created from the config.
+    @classmethod
+    def fromConfig(cls, configs, profile=None, transport=None, sessionCache=None, ledger=None, metrics=None, issueCache=None):
+
+        def get(key, default=None):
+            return cls.getConfig(configs, key, default, profile)
+
+        user = get('user')
+        password = get('password')
+        trackingUrl = get('tracking.url')
+        authUrl = get('auth.url')
+        defaultStartTime = get('default.start.time')
+        defaultEndTime = get('default.end.time')
+        defaultIssueId = get('default-issue-id')
+        isWeekendIgnored = cls.toBool(get('ignore-weekends', 'true'))
+        logLevel = get('log-level', 'INFO')
+        maxWorkers = int(get('max-workers', 4))
+        transport = transport or cls.transportFromConfig(configs)
+        sessionCache = sessionCache or cls.sessionCacheFromConfig(configs)
+        ledger = ledger or cls.ledgerFromConfig(configs, user)
+        holidays = calendars.loadHolidays(get('holidays.files', '').split(','))
+        timezone = get('timezone', 'UTC')
+        retryPolicy = RetryPolicy(maxAttempts=get('retry.max-attempts', 5), baseDelay=get('retry.base-delay', 0.5),
+                                  maxDelay=get('retry.max-delay', 30.0))
+        rateLimiter = TokenBucket(rate=get('rate-limit', 0), burst=get('rate-limit.burst'))
+        metricsFile = cls.getConfig(configs, 'metrics.file') or None
+        worklogUrl = get('worklog.url') or None
+        spool = Spool(cls.spoolPathFromConfig(configs, profile), get('spool.flush-timeout', Spool.DEFAULT_FLUSH_TIMEOUT))
+        issueSearchUrl = get('issue.search.url') or None
+        issueCache = issueCache or cls.issueCacheFromConfig(configs)
+
+        return cls(user, password, trackingUrl, authUrl, defaultStartTime, defaultEndTime, defaultIssueId, isWeekendIgnored, logLevel,
+                   maxWorkers, transport, sessionCache, ledger, holidays, timezone, retryPolicy, rateLimiter, metrics, metricsFile,
+                   worklogUrl, spool, issueSearchUrl, issueCache)
+
+    @classmethod
+    def transportFromConfig(cls, configs):
+
+        maxWorkers = int(cls.getConfig(configs, 'max-workers', 4))
+        return Transport(poolSize=cls.getConfig(configs, 'http.pool.size', max(Transport.DEFAULT_POOL_SIZE, maxWorkers)),
+                         connectTimeout=cls.getConfig(configs, 'http.connect.timeout', Transport.DEFAULT_CONNECT_TIMEOUT),
+                         readTimeout=cls.getConfig(configs, 'http.read.timeout', Transport.DEFAULT_READ_TIMEOUT))
+
+    @classmethod
+    def sessionCacheFromConfig(cls, configs):
+        return FileCache(cls.getConfig(configs, 'session.cache', cls.SESSION_CACHE_PATH),
+                         cls.getConfig(configs, 'session.ttl', cls.DEFAULT_SESSION_TTL))
+
+    # Accounts never share a spool: unless a profile sets its own 'profile.<name>.spool.path',
+    # it spools to the global path suffixed with its name
+    @classmethod
+    def spoolPathFromConfig(cls, configs, profile=None):
+
+        path = cls.getConfig(configs, 'spool.path', profile=profile) or cls.SPOOL_PATH
+        if profile and configs.get('profile.' + profile + '.spool.path') is None:
+            path += '.' + profile
+        return path
+
+    @classmethod
+    def issueCacheFromConfig(cls, configs):
+        return FileCache(cls.getConfig(configs, 'issue.cache', cls.ISSUE_CACHE_PATH),
+                         cls.getConfig(configs, 'issue.cache.ttl', cls.DEFAULT_ISSUE_CACHE_TTL))
+
+    @classmethod
+    def ledgerFromConfig(cls, configs, account=''):
+
+        ledgerPath = cls.getConfig(configs, 'ledger.path', cls.LEDGER_PATH)
+        return Ledger(ledgerPath, account) if ledgerPath else None
+
+    # Names listed in the 'profiles' setting, e.g. profiles = alice,bob
+    @classmethod
+    def listProfiles(cls, configs):
+        return [profile.strip() for profile in cls.getConfig(configs, 'profiles', '').split(',') if profile.strip()]
+
+    # Build one Tracker per profile. They share a single connection pool, session and issue caches, ledger and metrics.
+    @classmethod
+    def fromConfigProfiles(cls, profiles=None):
+
+        configs = cls.loadConfigFile()
+        profiles = profiles or cls.listProfiles(configs)
+        if not profiles:
+            raise ValueError('No profiles found. List them in the config file, e.g.: profiles = alice,bob')
+
+        unknown = set(profiles) - set(cls.listProfiles(configs))
+        if unknown:
+            raise ValueError('Unknown profiles: ' + ', '.join(sorted(unknown)))
+
+        # Rejected rather than silently ignored
+        overridden = ['profile.{}.{}'.format(profile, key) for profile in profiles for key in cls.SHARED_CONFIG_KEYS
+                      if configs.get('profile.{}.{}'.format(profile, key)) is not None]
+        if overridden:
+            raise ValueError('Shared by every profile, set them without the profile prefix: ' + ', '.join(overridden))
+
+        transport = cls.transportFromConfig(configs)
+        sessionCache = cls.sessionCacheFromConfig(configs)
+        ledger = cls.ledgerFromConfig(configs)
+        metrics = Metrics()
+        issueCache = cls.issueCacheFromConfig(configs)
+
+        return {profile: cls.fromConfig(configs, profile, transport, sessionCache, ledger, metrics, issueCache) for profile in profiles}
+
+    # Run execute() for every tracker concurrently. Failures (authentication, server errors,
+    # invalid dates) stay isolated to their account. Returns {profile: results or exception}.
+    @classmethod
+    def executeProfiles(cls, trackers, **executeArgs):
+
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(trackers))) as executor:
+            futures = {profile: executor.submit(tracker.execute, **executeArgs) for profile, tracker in trackers.items()}
+            for profile, future in futures.items():
+                try:
+                    outcomes[profile] = future.result()
+                except Exception as e:
+                    outcomes[profile] = e
+
+        return outcomes
+
+    @classmethod
+    def summarizeProfiles(cls, trackers, outcomes):
+
+        lines = ['{:<20} {:<20} {:>8} {:>8}  {}'.format('PROFILE', 'USER', 'TRACKED', 'FAILED', 'ERROR')]
+        for profile, outcome in outcomes.items():
+            user = trackers[profile].user
+            if isinstance(outcome, Exception):
+                lines.append('{:<20} {:<20} {:>8} {:>8}  {}'.format(profile, user, '-', '-', outcome))
+                continue
+            failed = sum(1 for result in outcome if not result.succeeded)
+            lines.append('{:<20} {:<20} {:>8} {:>8}'.format(profile, user, len(outcome) - failed, failed))
+
+        return '\n'.join(lines)
     
     @classmethod
     def generateTemplateConfFile(cls):
+        from jproperties import Properties
         
         prop = Properties()
 
@@ -78,11 +339,34 @@ class Tracker:
         prop['password'] = '****'
         prop['tracking.url'] = 'URL'
         prop['auth.url'] = 'URL'
+        prop['worklog.url'] = ''
+        prop['issue.search.url'] = ''
+        prop['issue.cache'] = cls.ISSUE_CACHE_PATH
+        prop['issue.cache.ttl'] = str(cls.DEFAULT_ISSUE_CACHE_TTL)
         prop['default.start.time'] = '09:00'
         prop['default.end.time'] = '17:00'
         prop['default-issue-id'] = 'ISSUE_ID'
         prop['ignore-weekends'] = 'true'
         prop['log-level'] = 'INFO'
+        prop['max-workers'] = '4'
+        prop['http.pool.size'] = str(Transport.DEFAULT_POOL_SIZE)
+        prop['http.connect.timeout'] = str(Transport.DEFAULT_CONNECT_TIMEOUT)
+        prop['http.read.timeout'] = str(Transport.DEFAULT_READ_TIMEOUT)
+        prop['session.cache'] = cls.SESSION_CACHE_PATH
+        prop['session.ttl'] = str(cls.DEFAULT_SESSION_TTL)
+        prop['ledger.path'] = cls.LEDGER_PATH
+        prop['holidays.files'] = ''
+        prop['timezone'] = 'UTC'
+        prop['retry.max-attempts'] = '5'
+        prop['retry.base-delay'] = '0.5'
+        prop['retry.max-delay'] = '30.0'
+        prop['rate-limit'] = '0'
+        prop['metrics.file'] = ''
+        prop['spool.path'] = cls.SPOOL_PATH
+        prop['spool.flush-timeout'] = str(Spool.DEFAULT_FLUSH_TIMEOUT)
+        prop['daemon.port'] = '8737'
+        prop['daemon.batch-window'] = '0.05'
+        prop['profiles'] = ''
 
         # Write the properties to the configuration file
         with open(cls.CONFIG_PATH, 'wb') as configFile:
@@ -92,6 +376,26 @@ class Tracker:
     def toBool(cls, booleanString):
         return booleanString.lower() in ['true']
 
+    # Accepts a tzinfo, 'UTC' or an IANA timezone name such as 'Europe/Lisbon'
+    @classmethod
+    def toTimezone(cls, timezone):
+
+        if isinstance(timezone, datetime.tzinfo):
+            return timezone
+        if timezone in (None, '', 'UTC', 'Z'):
+            return datetime.timezone.utc
+        return zoneinfo.ZoneInfo(timezone)
+
+    # Read an optional setting, falling back to a default when the key is absent.
+    # With a profile, 'profile.<name>.<key>' takes precedence over '<key>'.
+    @classmethod
+    def getConfig(cls, configs, key, default=None, profile=None):
+
+        entry = configs.get('profile.' + profile + '.' + key) if profile else None
+        if entry is None:
+            entry = configs.get(key)
+        return entry.data if entry is not None else default
+
     def initDateFields(self):
 
         today = datetime.date.today()
@@ -99,14 +403,12 @@ class Tracker:
         self.defaultMonth = '{:02d}'.format(today.month)
         self.defaultDay = '{:02d}'.format(today.day)
 
+    # Dates are expanded lazily and in order: each comma separated segment yields its
+    # intervals sorted by start, and the segments are merged into one sorted stream
     def parseDateInstruction(self, dateInstruction):
-        
-        result = []
-        datesList = dateInstruction.split(',')
-        for date in datesList:
-            result.extend(self.parseSingleDateInstruction(date))
 
-        return result
+        segments = [self.parseSingleDateInstruction(date) for date in dateInstruction.split(',')]
+        return heapq.merge(*segments, key=self.TrackInterval.sortKey)
 
     # E.g.:
     # 2024-02-26/2024-03-01[10:00-18:00]
@@ -117,27 +419,32 @@ class Tracker:
         dateInstruction = dateInstruction.strip()
         datePart, timePart = self.splitDateAndTime(dateInstruction)
         
-        dates = self.formatDate(datePart)
+        days = self.iterDays(datePart)
         startTime, endTime = self.formatTime(timePart)
+        startSeconds = self.parseClock(startTime)
+        endSeconds = self.parseClock(endTime)
+        if startSeconds >= endSeconds:
+            raise ValueError('Start time [{}] must be smaller than End time [{}]'.format(startTime, endTime))
 
-        result = []
-        for date in dates:
-            dateTarget = self.TrackInterval(start = self.formatIsoDateTime(date, startTime), end = self.formatIsoDateTime(date, endTime))
-            result.append(dateTarget)
-
-        return result
+        for day in days:
+            start, offset = self.toEpoch(day, startSeconds)
+            end, _ = self.toEpoch(day, endSeconds)
+            yield self.TrackInterval(start, end, offset)
     
-    def formatDate(self, date):
+    # Days of a date or date range, as days since the epoch
+    def iterDays(self, date):
 
         if '/' in date:
-            return self.handleDateRanges(date)
+            return self.iterDateRange(date)
         else:
-            formattedDate, _ = self.buildDate(date)
-            return [formattedDate]
+            _, dateObject = self.buildDate(date)
+            return iter([self.toEpochDay(dateObject)])
         
     def handleDateRanges(self, date):
+        return [(self.EPOCH_DATE + datetime.timedelta(days=day)).isoformat() for day in self.iterDateRange(date)]
+
+    def iterDateRange(self, date):
 
-        result = []
         dateInterval = date.split('/')
         
         startDateString, startDate = self.buildDate(dateInterval[0])
@@ -146,16 +453,68 @@ class Tracker:
         if (startDate >= endDate):
             raise ValueError('Start date [{}] must be smaller than End date [{}]'.format(startDateString, endDateString))
 
+        if loadNumpy() is not None:
+            return iter(self.expandBusinessDays(startDate, endDate))
+
+        return self.walkDays(startDate, endDate)
+
+    def walkDays(self, startDate, endDate):
+
         pointer = startDate
         while pointer <= endDate:
             if not self.ignoreDate(pointer):
-                result.append(pointer.strftime('%Y-%m-%d'))
+                yield self.toEpochDay(pointer)
             pointer += datetime.timedelta(days=1)
 
-        return result
+    # Vectorized equivalent of walking from startDate to endDate with ignoreDate:
+    # the whole range is filtered by numpy's business day calendar in one call
+    def expandBusinessDays(self, startDate, endDate):
+
+        days = numpy.arange(numpy.datetime64(startDate.date(), 'D'), numpy.datetime64(endDate.date(), 'D') + 1)
+        weekmask = '1111100' if self.isWeekendIgnored else '1111111'
+        holidays = numpy.array(sorted(self.holidays), dtype='datetime64[D]')
+        days = days[numpy.is_busday(days, weekmask=weekmask, holidays=holidays)]
+
+        return days.astype('int64').tolist()
     
     def ignoreDate(self, date):
-        return self.isWeekendIgnored and date.weekday() >= 5
+
+        day = date.date() if isinstance(date, datetime.datetime) else date
+        return (self.isWeekendIgnored and day.weekday() >= 5) or day in self.holidays
+
+    def toEpochDay(self, date):
+
+        day = date.date() if isinstance(date, datetime.datetime) else date
+        return (day - self.EPOCH_DATE).days
+
+    # Epoch seconds and UTC offset of a wall clock time on a day, in the configured timezone
+    def toEpoch(self, epochDay, secondsOfDay):
+
+        if self.timezone is datetime.timezone.utc:
+            return epochDay * 86400 + secondsOfDay, 0
+
+        localTime = (self.EPOCH_DATETIME + datetime.timedelta(days=epochDay, seconds=secondsOfDay)).replace(tzinfo=self.timezone)
+        return int(localTime.timestamp()), int(localTime.utcoffset().total_seconds())
+
+    def offsetAt(self, epoch):
+
+        if self.timezone is datetime.timezone.utc:
+            return 0
+
+        return int(datetime.datetime.fromtimestamp(epoch, self.timezone).utcoffset().total_seconds())
+
+    # Day since the epoch, in the configured timezone, of an epoch time
+    def epochDayOf(self, epoch):
+        return (epoch + self.offsetAt(epoch)) // 86400
+
+    # Seconds since midnight. 24:00 is the end of the day, nothing later is, so an interval never crosses into the next day.
+    def parseClock(self, clock):
+
+        match = re.match(r'^(\d{1,2}):(\d{2})$', clock.strip())
+        if not match or int(match.group(2)) > 59 or (int(match.group(1)), int(match.group(2))) > (24, 0):
+            raise ValueError('Time ' + clock + ' is in an invalid format. Expected HH:MM')
+
+        return int(match.group(1)) * 3600 + int(match.group(2)) * 60
         
     def buildDate(self, date):
 
@@ -193,9 +552,6 @@ class Tracker:
         
         return timeComponents[0], timeComponents[1]
     
-    def formatIsoDateTime(self, date, time):
-        return date + 'T' + time + ':00.000Z'
-        
     def splitDateAndTime(self, datetime):
 
         start = datetime.find('[')
@@ -204,10 +560,58 @@ class Tracker:
         else:
             return datetime, ''
         
+    # Like parseDateInstruction, but a date given without a time range excludes the whole day.
+    # E.g.: 13 -> all of the 13th, 13[12:00-13:00] -> only the lunch break
+    def parseExceptInstruction(self, exceptInstruction):
+
+        segments = [self.parseSingleExceptInstruction(exceptDate) for exceptDate in exceptInstruction.split(',')]
+        return heapq.merge(*segments, key=self.TrackInterval.sortKey)
+
+    def parseSingleExceptInstruction(self, exceptDate):
+
+        datePart, timePart = self.splitDateAndTime(exceptDate.strip())
+        if timePart != '':
+            yield from self.parseSingleDateInstruction(exceptDate)
+            return
+
+        for day in self.iterDays(datePart):
+            start, offset = self.toEpoch(day, 0)
+            end, _ = self.toEpoch(day + 1, 0)
+            yield self.TrackInterval(start, end, offset)
+
+    # Subtract the exceptions from the dates in a single sweep over both lists sorted by start.
+    # Overlapping dates are merged, and so are adjacent ones on the same day.
     def removeExceptDates(self, dates, exceptDates):
         self.logging.debug('Removing except dates. Current dates: [%s]. Except dates [%s]', dates, exceptDates)
 
-        return [x for x in dates if x not in exceptDates]
+        ranges = self.coalesceRanges(sorted(map(self.toRange, dates)))
+        exceptRanges = self.coalesceRanges(sorted(map(self.toRange, exceptDates)), isOverlapWarned=False)
+
+        return [self.fromRange(dateRange) for dateRange in intervals.subtract(ranges, exceptRanges)]
+
+    # Expects ranges sorted by start and yields the merged ones lazily.
+    # Overlaps are worth a warning for dates to track, not for exceptions.
+    def coalesceRanges(self, ranges, isOverlapWarned=True):
+
+        def isSameDay(previous, current):
+            return self.epochDayOf(previous[0]) == self.epochDayOf(current[0])
+
+        def warnOverlap(previous, current):
+            self.logging.warning('Overlapping intervals [%s] and [%s] will be tracked once', self.fromRange(previous), self.fromRange(current))
+
+        return intervals.coalesce(ranges, isMergeable=isSameDay, onOverlap=warnOverlap if isOverlapWarned else None)
+
+    def toRange(self, interval):
+
+        if interval.start >= interval.end:
+            raise ValueError('Start time [{}] must be smaller than End time [{}]'.format(interval.startIso, interval.endIso))
+
+        return interval.start, interval.end
+
+    def fromRange(self, dateRange):
+
+        start, end = dateRange
+        return self.TrackInterval(start, end, self.offsetAt(start))
     
     def auth(self):
 
@@ -216,10 +620,16 @@ class Tracker:
             "user": self.user
         }
 
-        self.logging.debug('Authenticating to Tracker server. URL [%s] Body [%s]', self.authUrl, body)
+        self.logging.debug('Authenticating to Tracker server. URL [%s] user [%s]', self.authUrl, self.user)
 
-        response = requests.post(url=self.authUrl, json=body)
+        startedAt = time.perf_counter()
+        try:
+            response = self.transport.post(self.authUrl, json=body)
+        except Exception:
+            self.metrics.observe('tracker_auth_seconds', time.perf_counter() - startedAt, status='error')
+            raise
         status = response.status_code
+        self.metrics.observe('tracker_auth_seconds', time.perf_counter() - startedAt, status=status)
 
         self.logging.info('Got response from auth with status code [%d]', status)
 
@@ -227,8 +637,44 @@ class Tracker:
             raise Exception(f'Failed to authenticate to server. Server returned status code: {status}')
 
         cookiesString = response.headers.get('Set-Cookie')
-        return self.filterCookies(cookiesString)
+        self.cookies = self.filterCookies(cookiesString)
+        return self.cookies
     
+    # Reuse the cookies of this or of a previous run while they are still cached, authenticating only when needed
+    def ensureSession(self):
+
+        if self.cookies:
+            return self.cookies
+
+        cacheKey = self.sessionCacheKey()
+        cachedCookies = self.sessionCache.get(cacheKey) if self.sessionCache else None
+        if cachedCookies:
+            self.logging.debug('Reusing cached session for user [%s]', self.user)
+            self.cookies = cachedCookies
+            return self.cookies
+
+        cookies = self.auth()
+        if self.sessionCache and cookies:
+            self.sessionCache.put(cacheKey, cookies)
+        return cookies
+
+    # Called when the server rejects staleCookies. Concurrent workers may all hit the expired
+    # session at once: only the first one authenticates again, the others reuse its cookies.
+    def reauthenticate(self, staleCookies):
+
+        with self.authLock:
+            if self.cookies != staleCookies:
+                return self.cookies
+
+            self.logging.info('Session rejected by server. Authenticating again')
+            self.cookies = ''
+            if self.sessionCache:
+                self.sessionCache.invalidate(self.sessionCacheKey())
+            return self.ensureSession()
+
+    def sessionCacheKey(self):
+        return self.user + '@' + self.authUrl
+
     def filterCookies(self, cookieString):
 
         if cookieString in [None, '']:
@@ -261,14 +707,14 @@ class Tracker:
 
         return result
 
-    def execute(self, dates, exceptDates=None, isWholeWeek=False, issueId=None, logLevel=''):
+    def execute(self, dates, exceptDates=None, isWholeWeek=False, issueId=None, logLevel='', force=False, reconcile=False, dryRun=False):
 
         if logLevel != '':
-            self.consoleHandler.setLevel(logging.getLevelName(logLevel))
+            setConsoleLevel(logLevel)
         
         self.logging.info('Executing tracker')
-        self.logging.debug('Parameters: dates [%s] exceptDates [%s] isWholeWeek [%s] IssueId [%s] logLevel [%s]',
-                           dates, exceptDates, isWholeWeek, issueId, logLevel)
+        self.logging.debug('Parameters: dates [%s] exceptDates [%s] isWholeWeek [%s] IssueId [%s] logLevel [%s] force [%s] reconcile [%s] dryRun [%s]',
+                           dates, exceptDates, isWholeWeek, issueId, logLevel, force, reconcile, dryRun)
 
         if not self.isWeekendIgnored:
             self.logging.warning('Weekeends will not be ignored in this execution!')
@@ -277,38 +723,567 @@ class Tracker:
             self.logging.debug('Using issueId as the default [%s]', self.defaultIssueId)
             issueId = self.defaultIssueId
 
+        self.checkIssues([issueId])
+
+        plannedIntervals = self.metrics.timedIterator('tracker_parse_seconds', self.planIntervals(dates, exceptDates, isWholeWeek))
+        jobs = ((issueId, date) for date in plannedIntervals)
+        if not force:
+            jobs = self.skipSubmitted(jobs)
+        if reconcile:
+            jobs = self.reconcileJobs(jobs)
+
+        if dryRun:
+            self.logPlan(jobs)
+            return []
+
+        results = sorted(self.runJobs(jobs), key=lambda result: result.interval.start)
+        if not results:
+            self.logging.info('Nothing to track. Intervals already submitted are skipped, use --force to submit them again')
+            return []
+
+        self.logResults(results)
+        return results
+
+    # Lazily expand a dates expression into the intervals to be tracked, sorted by start.
+    # Overlapping intervals are merged and the exceptions are carved out on the fly.
+    def planIntervals(self, dates, exceptDates=None, isWholeWeek=False):
+
         if isWholeWeek:
             dates = self.parseWholeWeek(dates)
 
-        datesList = self.parseDateInstruction(dates)
-            
+        ranges = self.coalesceRanges(map(self.toRange, self.parseDateInstruction(dates)))
+
         if exceptDates:
-            exceptDatesList = self.parseDateInstruction(exceptDates)
-            datesList = self.removeExceptDates(datesList, exceptDatesList)
+            exceptRanges = self.coalesceRanges(map(self.toRange, self.parseExceptInstruction(exceptDates)), isOverlapWarned=False)
+            ranges = intervals.subtract(ranges, exceptRanges)
+
+        return map(self.fromRange, ranges)
+
+    # Compare the (issueId, interval) jobs with the worklogs already on the server and keep
+    # only what is missing there. Parts of an interval overlapping a worklog of another issue
+    # are conflicts: they are reported and left out, never logged twice.
+    def reconcileJobs(self, jobs):
+
+        if not self.worklogUrl:
+            raise ValueError('Reconciliation needs the URL listing existing worklogs. Set worklog.url in the config file')
+
+        jobs = list(jobs)
+        if not jobs:
+            return jobs
+
+        firstDay = min(self.epochDayOf(job[1].start) for job in jobs)
+        lastDay = max(self.epochDayOf(job[1].end - 1) for job in jobs)
 
-        headers = {
-            "Cookie": self.auth()
+        index = WorklogIndex(self.epochDayOf)
+        for worklog in self.fetchWorklogs(firstDay, lastDay):
+            try:
+                start, _ = self.TrackInterval.parseIso(worklog['startTime'])
+                end, _ = self.TrackInterval.parseIso(worklog['endTime'])
+            except (KeyError, TypeError, ValueError):
+                self.logging.warning('Ignoring malformed worklog from server [%s]', worklog)
+                continue
+            index.add(worklog.get('issueKey'), start, end)
+
+        missing = []
+        conflictCount = 0
+        for issueId, interval in jobs:
+            missingRanges, conflicts = index.diff(issueId, self.toRange(interval))
+            missing.extend((issueId, self.fromRange(dateRange)) for dateRange in missingRanges)
+            for conflict in conflicts:
+                conflictCount += 1
+                self.logging.warning('Interval [%s] of issue [%s] overlaps a worklog of another issue and will not be tracked',
+                                     self.fromRange(conflict), issueId)
+
+        self.metrics.increment('tracker_intervals_total', conflictCount, result='conflict')
+        self.logging.info('Reconciled [%d] intervals with [%d] worklogs on the server: [%d] missing, [%d] conflicts',
+                          len(jobs), len(index), len(missing), conflictCount)
+        return missing
+
+    # Worklogs of the user between two epoch days (inclusive). The first page tells the total,
+    # the remaining pages are then fetched concurrently. Servers answering with a bare list
+    # do not tell it, so their pages are read one after the other until a short one.
+    def fetchWorklogs(self, firstDay, lastDay):
+
+        params = {
+            'user': self.user,
+            'from': (self.EPOCH_DATE + datetime.timedelta(days=firstDay)).isoformat(),
+            'to': (self.EPOCH_DATE + datetime.timedelta(days=lastDay)).isoformat(),
+            'maxResults': self.WORKLOG_PAGE_SIZE
         }
-        
-        self.logging.debug('Sending [%d] tracking requests to server:', len(datesList))
-        for date in datesList:
-            body = {
-                "comment": "",
-                "endTime": date.end,
-                "issueKey": issueId,
-                "startTime": date.start
+
+        page = self.fetchWorklogPage(params, 0)
+        if isinstance(page, list):
+            worklogs = list(page)
+            while len(page) >= self.WORKLOG_PAGE_SIZE:
+                page = self.fetchWorklogPage(params, len(worklogs))
+                worklogs.extend(page)
+            return worklogs
+
+        worklogs = list(page.get('worklogs', []))
+        total = int(page.get('total', len(worklogs)))
+        # The server may serve smaller pages than asked for
+        pageSize = len(worklogs)
+        if pageSize == 0 or total <= pageSize:
+            return worklogs
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            pages = executor.map(lambda startAt: self.fetchWorklogPage(params, startAt), range(pageSize, total, pageSize))
+            for page in pages:
+                worklogs.extend(page.get('worklogs', []) if isinstance(page, dict) else page)
+
+        return worklogs
+
+    def fetchWorklogPage(self, params, startAt):
+        return self.fetchJson(self.worklogUrl, dict(params, startAt=startAt), 'existing worklogs')
+
+    # GET a JSON document with the session cookies, authenticating again once if the session was rejected
+    def fetchJson(self, url, params, description):
+
+        isReauthenticated = False
+        while True:
+            cookies = self.ensureSession()
+            startedAt = time.perf_counter()
+            response = self.transport.get(url, params=params, headers={"Cookie": cookies})
+            status = response.status_code
+            self.metrics.observe('tracker_fetch_seconds', time.perf_counter() - startedAt, status=status)
+
+            if status in self.AUTH_FAILURE_STATUSES and not isReauthenticated:
+                self.reauthenticate(cookies)
+                isReauthenticated = True
+                continue
+
+            if status > 300:
+                raise Exception(f'Failed to fetch {description}. Server returned status code: {status}')
+
+            self.logging.debug('Fetched %s from [%s] with status code [%d]', description, url, status)
+            return response.json()
+
+    # Fail before sending anything when an issue does not exist or is closed
+    def checkIssues(self, issueKeys):
+
+        invalidIssues = self.findInvalidIssues(issueKeys)
+        if invalidIssues:
+            raise ValueError('Cannot track time on: ' + ', '.join('issue [{}] {}'.format(key, reason) for key, reason in sorted(invalidIssues.items())))
+
+    # Look every distinct issue key up in the issue cache, then the remaining ones on the server,
+    # ISSUE_BATCH_SIZE keys per search and the searches in parallel. Returns {issueKey: reason} of
+    # the invalid ones. Issues are not checked when issue.search.url is not set, nor when the search fails.
+    def findInvalidIssues(self, issueKeys):
+
+        if not self.issueSearchUrl:
+            return {}
+
+        issueKeys = sorted({issueKey for issueKey in issueKeys if issueKey})
+        cacheKeys = {issueKey: self.issueCacheKey(issueKey) for issueKey in issueKeys}
+        cached = self.issueCache.getMany(cacheKeys.values()) if self.issueCache else {}
+        # A reason when invalid, '' when valid
+        reasons = {issueKey: cached[cacheKey] for issueKey, cacheKey in cacheKeys.items() if cacheKey in cached}
+
+        unknown = [issueKey for issueKey in issueKeys if issueKey not in reasons]
+        self.metrics.increment('tracker_issue_lookups_total', len(reasons), source='cache')
+        self.metrics.increment('tracker_issue_lookups_total', len(unknown), source='server')
+
+        if unknown:
+            batches = [unknown[index:index + self.ISSUE_BATCH_SIZE] for index in range(0, len(unknown), self.ISSUE_BATCH_SIZE)]
+            try:
+                # Before the searches run in parallel, so they do not all authenticate
+                self.ensureSession()
+                with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(batches))) as executor:
+                    found = {}
+                    for batchReasons in executor.map(self.searchIssues, batches):
+                        found.update(batchReasons)
+            except Exception as e:
+                self.logging.warning('Could not check the issues before tracking: %s', e)
+                found = {}
+
+            if found and self.issueCache:
+                self.issueCache.putMany({cacheKeys[issueKey]: reason for issueKey, reason in found.items()})
+            reasons.update(found)
+
+        self.logging.debug('Checked [%d] issues: [%d] from cache', len(issueKeys), len(issueKeys) - len(unknown))
+        return {issueKey: reason for issueKey, reason in reasons.items() if reason}
+
+    # One JQL search for a batch of keys. Keys the server does not return do not exist or are not visible.
+    def searchIssues(self, issueKeys):
+
+        jql = 'key in ({})'.format(','.join('"{}"'.format(issueKey.replace('\\', '\\\\').replace('"', '\\"')) for issueKey in issueKeys))
+        # validateQuery=warn: unknown keys are left out of the results instead of failing the whole search
+        params = {'jql': jql, 'fields': 'status', 'maxResults': len(issueKeys), 'validateQuery': 'warn'}
+        payload = self.fetchJson(self.issueSearchUrl, params, 'issues')
+
+        statuses = {}
+        for issue in payload.get('issues', []):
+            status = (issue.get('fields') or {}).get('status') or {}
+            statuses[str(issue.get('key', '')).upper()] = status
+
+        reasons = {}
+        for issueKey in issueKeys:
+            status = statuses.get(issueKey.upper())
+            if status is None:
+                reasons[issueKey] = 'does not exist or is not visible to user [{}]'.format(self.user)
+            elif (status.get('statusCategory') or {}).get('key') == 'done':
+                reasons[issueKey] = 'is closed (status [{}])'.format(status.get('name', 'done'))
+            else:
+                reasons[issueKey] = ''
+        return reasons
+
+    def issueCacheKey(self, issueKey):
+        return self.user + '@' + self.issueSearchUrl + '#' + issueKey
+
+    def logPlan(self, jobs):
+
+        count = 0
+        for job in jobs:
+            count += 1
+            self.logging.info('Dry run: would track issue [%s] interval [%s - %s]', job[0], job[1].startIso, job[1].endIso)
+        self.logging.info('Dry run: [%d] intervals would be tracked. Nothing was sent', count)
+
+    # Offline mode: write the intervals to the spool and return without contacting the server.
+    # flushSpool() sends them later. Returns how many intervals were spooled.
+    def spoolIntervals(self, dates, exceptDates=None, isWholeWeek=False, issueId=None):
+
+        self.checkSpool()
+        issueId = issueId or self.defaultIssueId
+        # Rejected now, rather than dead-lettered by the flush once the user is gone
+        self.checkIssues([issueId])
+        entries = [{'account': self.user, 'issueKey': issueId, 'startTime': interval.startIso, 'endTime': interval.endIso}
+                   for interval in self.planIntervals(dates, exceptDates, isWholeWeek)]
+        self.spool.append(entries)
+
+        self.logging.info('Spooled [%d] intervals to [%s]', len(entries), self.spool.path)
+        return len(entries)
+
+    # The ledger is what keeps a batch sent again after an outage from being tracked twice
+    def checkSpool(self):
+
+        if not self.spool:
+            raise ValueError('No spool configured. Set spool.path in the config file')
+        if not self.ledger:
+            raise ValueError('The spool needs the ledger to never send an interval twice. Set ledger.path in the config file')
+
+    # A failure the server will answer the same way however often it is sent again
+    def isRejected(self, result):
+        return (result.status is not None and 400 <= result.status < 500
+                and not self.retryPolicy.isRetryable(result.status) and result.status not in self.AUTH_FAILURE_STATUSES)
+
+    # Send what is in the spool, one batch at a time, moving the checkpoint after each batch.
+    # A batch only settles once every entry in it was either tracked or rejected by the server (4xx):
+    # rejected entries are moved to the spool's failed file. While the server is unavailable (network
+    # errors, 5xx, throttling, authentication) the round stops and the batch stays in the spool; the
+    # entries of it already tracked are skipped next time thanks to the ledger.
+    # Returns the results, or None when another process is already flushing.
+    def flushSpool(self):
+
+        self.checkSpool()
+        with self.spool.flushing() as isFlusher:
+            if not isFlusher:
+                self.logging.info('Spool [%s] is being flushed by another process', self.spool.path)
+                return None
+
+            results = []
+            while True:
+                entries, offset = self.spool.readPending(self.LEDGER_BATCH_SIZE)
+                if not entries:
+                    break
+
+                # Duplicates come from entries spooled twice
+                byKey = {}
+                failures = []
+                for entry in entries:
+                    if entry.get('account', self.user) != self.user:
+                        failures.append(dict(entry, error='Spooled for account [{}], not [{}]'.format(entry.get('account'), self.user)))
+                    elif 'issueKey' in entry:
+                        byKey.setdefault((entry['issueKey'], entry['startTime'], entry['endTime']), entry)
+                jobs = {(key[0], self.TrackInterval(key[1], key[2])): key for key in byKey}
+
+                try:
+                    batchResults = list(self.runJobs(self.skipSubmitted(jobs)))
+                except Exception as e:
+                    self.logging.warning('Could not flush spool [%s]: %s', self.spool.path, e)
+                    return results
+
+                results.extend(batchResults)
+                unsent = [result for result in batchResults if not result.succeeded and not self.isRejected(result)]
+                if unsent:
+                    self.logging.warning('Server unavailable, [%d] intervals stay in spool [%s]: %s', len(unsent), self.spool.path, unsent[0].error)
+                    return results
+
+                failures += [dict(byKey[jobs[(result.issueId, result.interval)]], error=result.error) for result in batchResults if not result.succeeded]
+                self.spool.deadLetter(failures)
+                self.spool.commit(offset)
+
+                for failure in failures:
+                    self.logging.error('Giving up on issue [%s] interval [%s - %s]: %s. Kept in [%s]',
+                                       failure.get('issueKey'), failure.get('startTime'), failure.get('endTime'), failure['error'], self.spool.failedPath)
+
+            self.spool.compact()
+            return results
+
+    # Flush the spool until it is empty, waiting longer after every unsuccessful round, for at most
+    # timeout seconds (the spool's flushTimeout by default).
+    # Returns whether every interval was tracked: False when some are left in the spool or were rejected.
+    def drainSpool(self, timeout=None):
+
+        deadline = time.monotonic() + (self.spool.flushTimeout if timeout is None else float(timeout))
+        delay = self.retryPolicy.baseDelay
+        isAnyRejected = False
+        while True:
+            results = self.flushSpool()
+            isAnyRejected = isAnyRejected or any(self.isRejected(result) for result in results or [])
+            if results is None or not self.spool.hasPending():
+                return not isAnyRejected and not self.spool.hasPending()
+
+            if time.monotonic() + delay > deadline:
+                self.logging.warning('Spool [%s] still has intervals to send. They are sent by the next flush', self.spool.path)
+                return False
+
+            time.sleep(delay)
+            delay = min(delay * 2, self.retryPolicy.maxDelay)
+
+    # Tracked time from the ledger, without asking the server. dates limits the days, e.g. '02-01/02-29' or '' for all;
+    # see Ledger.totals() for groupBy. Returns reports.ReportRow rows.
+    def report(self, groupBy='day', dates='', issueId=None):
+
+        if not self.ledger:
+            raise ValueError('Reports are built from the ledger. Set ledger.path in the config file')
+
+        fromDay = toDay = None
+        if dates:
+            days = dates.split('/')
+            if len(days) > 2:
+                raise ValueError('Report dates must be one day or a range, e.g. 02-01/02-29')
+            fromDay, _ = self.buildDate(days[0])
+            toDay, _ = self.buildDate(days[-1])
+
+        return reports.toReportRows(self.ledger.totals(groupBy, fromDay, toDay, issueId))
+
+    # Submit jobs, authenticating only once the first job shows there is something to send.
+    # Invalid dates are detected while taking the first job, before anything is sent.
+    def runJobs(self, jobs):
+
+        jobs = iter(jobs)
+        firstJob = next(jobs, None)
+        if firstJob is None:
+            return
+
+        self.ensureSession()
+        yield from self.submitIntervals(chain([firstJob], jobs))
+
+    # Bulk mode: stream a CSV/JSONL file through parse -> validate -> submit, one row at a time,
+    # over a single authenticated session. Failures are reported per row with their line number.
+    def executeImport(self, path, logLevel='', force=False):
+
+        if logLevel != '':
+            setConsoleLevel(logLevel)
+
+        self.logging.info('Importing worklogs from [%s]', path)
+
+        report = importer.ImportReport()
+        try:
+            importer.checkFile(path)
+        except (OSError, ValueError) as e:
+            report.error = str(e)
+            self.logging.error('Cannot import [%s]: %s', path, e)
+            return report
+
+        # A first pass over the file collects its issues, so they are all checked before anything is sent
+        invalidIssues = self.findInvalidIssues(self.issueOfRow(row) for row in importer.readRows(path) if not row.error)
+        jobs = self.buildImportJobs(importer.readRows(path), report, force, invalidIssues)
+        for result in self.runJobs(jobs):
+            if result.succeeded:
+                report.succeeded += 1
+            else:
+                report.addFailure(result.lineNumber, f'Interval [{result.interval.startIso} - {result.interval.endIso}]: {result.error}')
+
+        self.logging.info('Imported [%d] rows: [%d] intervals tracked, [%d] skipped, [%d] failures',
+                          report.rows, report.succeeded, report.skipped, report.failed)
+        for lineNumber, error in sorted(report.failures, key=lambda failure: failure[0]):
+            self.logging.warning('Line [%d]: %s', lineNumber, error)
+
+        return report
+
+    def issueOfRow(self, row):
+        return row.values.get('issueId') or self.defaultIssueId
+
+    def buildImportJobs(self, rows, report, force, invalidIssues=None):
+
+        for row in rows:
+            report.rows += 1
+            if row.error:
+                report.addFailure(row.lineNumber, row.error)
+                continue
+
+            values = row.values
+            try:
+                if not values.get('dates'):
+                    raise ValueError('Field [dates] is mandatory')
+                isWholeWeek = self.toBool(str(values.get('wholeWeek', 'false')))
+                issueId = self.issueOfRow(row)
+                if invalidIssues and issueId in invalidIssues:
+                    raise ValueError(f'Issue [{issueId}] {invalidIssues[issueId]}')
+                with self.metrics.timer('tracker_parse_seconds'):
+                    jobs = [(issueId, date, row.lineNumber) for date in self.planIntervals(values['dates'], values.get('exceptDates'), isWholeWeek)]
+            except ValueError as e:
+                report.addFailure(row.lineNumber, str(e))
+                continue
+
+            remaining = jobs if force else list(self.skipSubmitted(jobs))
+
+            report.intervals += len(jobs)
+            report.skipped += len(jobs) - len(remaining)
+            yield from remaining
+
+    # Drop the (issueId, interval) jobs the ledger already recorded as submitted.
+    # Jobs are looked up in batches, so the job stream is never materialized.
+    def skipSubmitted(self, jobs):
+
+        if not self.ledger:
+            yield from jobs
+            return
+
+        jobs = iter(jobs)
+        while batch := list(islice(jobs, self.LEDGER_BATCH_SIZE)):
+            keys = [(job[0], job[1].startIso, job[1].endIso) for job in batch]
+            submitted = self.ledger.findSubmitted(keys)
+            if submitted:
+                self.logging.debug('Skipping [%d] intervals already submitted', len(submitted))
+                self.metrics.increment('tracker_intervals_total', len(submitted), result='skipped')
+            yield from (job for job, key in zip(batch, keys) if key not in submitted)
+
+    # Submit (issueId, interval[, lineNumber]) jobs concurrently, yielding a TrackResult per job as it completes.
+    # At most maxWorkers requests are in flight and at most twice that many are queued, so the
+    # job iterable is consumed lazily and long streams are processed in constant memory.
+    def submitIntervals(self, jobs):
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            pending = set()
+            for job in jobs:
+                if len(pending) >= self.maxWorkers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                if self.profiler:
+                    pending.add(executor.submit(self.profiler.runcall, self.submitInterval, *job))
+                else:
+                    pending.add(executor.submit(self.submitInterval, *job))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def submitInterval(self, issueId, interval, lineNumber=None):
+
+        body = {
+            "comment": "",
+            "endTime": interval.endIso,
+            "issueKey": issueId,
+            "startTime": interval.startIso
+        }
+
+        startedAt = time.perf_counter()
+        try:
+            status = self.sendRequest(body)
+        except Exception as e:
+            latency = time.perf_counter() - startedAt
+            self.logging.error('Request for issue [%s] interval [%s - %s] failed: %s', issueId, interval.startIso, interval.endIso, e)
+            self.metrics.increment('tracker_intervals_total', result='failed')
+            return self.TrackResult(interval, issueId, succeeded=False, latency=latency, error=str(e), lineNumber=lineNumber)
+
+        latency = time.perf_counter() - startedAt
+        succeeded = status <= 300
+        if succeeded and self.ledger:
+            self.ledger.record(issueId, body['startTime'], body['endTime'])
+        error = None if succeeded else f'Server returned status code: {status}'
+        self.metrics.increment('tracker_intervals_total', result='succeeded' if succeeded else 'failed')
+        return self.TrackResult(interval, issueId, succeeded, status, latency, error, lineNumber)
+
+    # Export the metrics of the run, to metricsFile unless another path is given
+    def writeMetrics(self, path=None):
+
+        path = path or self.metricsFile
+        if not path:
+            return None
+
+        self.metrics.write(path)
+        self.logging.debug('Metrics written to [%s]', path)
+        return path
+
+    def logResults(self, results):
+
+        failed = [result for result in results if not result.succeeded]
+        self.logging.info('Tracked [%d] of [%d] intervals. Failed: [%d]', len(results) - len(failed), len(results), len(failed))
+        for result in failed:
+            self.logging.warning('Failed to track issue [%s] interval [%s - %s]: %s',
+                                 result.issueId, result.interval.startIso, result.interval.endIso, result.error)
+
+    # Session cookies obtained by auth() are attached to every request.
+    # A request rejected for an expired session is retried once after authenticating again.
+    # Throttled (429), unavailable (502/503/504) and network failures are retried with backoff,
+    # and every attempt waits for the rate limiter.
+    def sendRequest(self, body):
+
+        requestId = uuid.uuid4().hex[:16]
+        attempt = 0
+        isReauthenticated = False
+        while True:
+            cookies = self.cookies
+            headers = {
+                "Cookie": cookies
             }
-            self.sendRequest(body, headers)
-            
-            
-    def sendRequest(self, body, headers):
-        self.logging.debug('URL: [%s] headers: [%s] body [%s]', self.trackingUrl, headers, body)
-        self.logging.info('Sending request with body [%s]',  body)
-
-        response = requests.post(self.trackingUrl, json=body, headers=headers)
-        status = response.status_code
 
-        self.logging.info('Got response with status code [%d] and body [%s]', status, response.json())
+            self.rateLimiter.acquire()
+            attempt += 1
+            fields = {'requestId': requestId, 'attempt': attempt, 'issueKey': body.get('issueKey'), 'startTime': body.get('startTime')}
+            self.logging.debug('Sending tracking request to [%s] with body [%s]', self.trackingUrl, body, extra=fields)
 
-        if status > 300:
-            raise Exception(f'One request failed with status code: {status}. Check what happened in Tracker server...')
\ No newline at end of file
+            startedAt = time.perf_counter()
+            try:
+                response = self.transport.post(self.trackingUrl, json=body, headers=headers)
+            except Exception as e:
+                self.metrics.observe('tracker_request_seconds', time.perf_counter() - startedAt, status='error')
+                if not self.transport.isTransientError(e) or not self.retryPolicy.canRetry(attempt):
+                    raise
+                self.metrics.increment('tracker_retries_total', reason='error')
+                delay = self.retryPolicy.delay(attempt)
+                self.logging.warning('Request failed (%s). Retrying in [%.2f] seconds', e, delay, extra=fields)
+                time.sleep(delay)
+                continue
+
+            status = response.status_code
+            latency = time.perf_counter() - startedAt
+            fields.update(status=status, latencyMs=round(latency * 1000, 1))
+            self.metrics.observe('tracker_request_seconds', latency, status=status)
+
+            if status in self.AUTH_FAILURE_STATUSES and not isReauthenticated:
+                self.logging.info('Got response with status code [%d]. Retrying with a new session', status, extra=fields)
+                self.metrics.increment('tracker_retries_total', reason=status)
+                self.reauthenticate(cookies)
+                isReauthenticated = True
+                continue
+
+            delay = None
+            if self.retryPolicy.isRetryable(status) and self.retryPolicy.canRetry(attempt):
+                delay = self.retryPolicy.delay(attempt, response.headers.get('Retry-After'))
+                if delay is None:
+                    self.logging.warning('Server asked to retry after [%s], longer than retry.max-delay. Not retrying', response.headers.get('Retry-After'),
+                                         extra=fields)
+
+            if delay is not None:
+                self.metrics.increment('tracker_retries_total', reason=status)
+                self.logging.warning('Got response with status code [%d]. Retrying in [%.2f] seconds', status, delay, extra=fields)
+                if status == 429:
+                    # The server is throttling all of us, not only this request
+                    self.rateLimiter.pauseFor(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            self.logging.info('Got response with status code [%d] for issue [%s] interval start [%s]', status, fields['issueKey'], fields['startTime'],
+                              extra=fields)
+
+            if status > 300:
+                self.logging.error('One request failed with status code: %d. Check what happened in Tracker server... Response body [%s]',
+                                   status, response.text, extra=fields)
+
+            return status
@@ -0,0 +1,109 @@
+import argparse
+import datetime
+import statistics
+import time
+from tracker import Tracker
+from retry import RetryPolicy
+from stubserver import StubServer
+
+# Benchmarks of the parsing helpers and of the whole submission path.
+# Run with: python tracker_bench.py [--quick]
+# Every benchmark reports its throughput and the p50/p99 latency of one operation.
+
+def newTracker(stub=None, maxWorkers=8):
+
+    trackingUrl = stub.trackingUrl if stub else 'http://127.0.0.1/track'
+    authUrl = stub.authUrl if stub else 'http://127.0.0.1/auth'
+    # Injected failures are measured as failures, not hidden behind retries
+    return Tracker('user', 'pass', trackingUrl, authUrl, '09:00', '17:00', 'TASK', logLevel='CRITICAL', maxWorkers=maxWorkers,
+                   retryPolicy=RetryPolicy(maxAttempts=1))
+
+def percentiles(samples):
+
+    if len(samples) < 2:
+        return samples[0], samples[0]
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return cuts[49], cuts[98]
+
+# Run operation `rounds` times, after a warm up round (lazy imports, caches).
+# Returns items per second and the p50/p99 duration of one round.
+def measure(operation, rounds):
+
+    operation()
+    durations = []
+    items = 0
+    for _ in range(rounds):
+        startedAt = time.perf_counter()
+        items += operation()
+        durations.append(time.perf_counter() - startedAt)
+
+    p50, p99 = percentiles(durations)
+    return items / sum(durations), p50, p99
+
+def benchParseDateInstruction(rounds, years):
+
+    tracker = newTracker()
+    dates = '2000-01-01/{}-12-31[09:00-17:00]'.format(1999 + years)
+    return measure(lambda: sum(1 for _ in tracker.parseDateInstruction(dates)), rounds)
+
+def benchHandleDateRanges(rounds, years):
+
+    tracker = newTracker()
+    dates = '2000-01-01/{}-12-31'.format(1999 + years)
+    return measure(lambda: len(tracker.handleDateRanges(dates)), rounds)
+
+def benchRemoveExceptDates(rounds, years):
+
+    tracker = newTracker()
+    dates = list(tracker.parseDateInstruction('2000-01-01/{}-12-31'.format(1999 + years)))
+    # A lunch break every day and a few whole days off
+    exceptDates = list(tracker.parseExceptInstruction('2000-01-01/{}-12-31[12:00-13:00]'.format(1999 + years)))
+    exceptDates += list(tracker.parseExceptInstruction(','.join('{}-12-25'.format(year) for year in range(2000, 2000 + years))))
+    return measure(lambda: len(tracker.removeExceptDates(dates, exceptDates)), rounds)
+
+# End to end execute() against the stub server. Latency percentiles are per tracking request.
+def benchExecute(intervals, latency, errorRate, maxWorkers):
+
+    with StubServer(latency=latency, errorRate=errorRate) as stub:
+        tracker = newTracker(stub, maxWorkers)
+        # Enough calendar days to hold the requested number of business days
+        start = datetime.date(2000, 1, 3)
+        end = start + datetime.timedelta(days=intervals * 7 // 5 + 7)
+        days = tracker.handleDateRanges('{}/{}'.format(start, end))
+
+        dates = '{}/{}'.format(days[0], days[intervals - 1])
+        startedAt = time.perf_counter()
+        results = tracker.execute(dates)
+        elapsed = time.perf_counter() - startedAt
+        tracker.transport.close()
+
+    latencies = [result.latency for result in results]
+    p50, p99 = percentiles(latencies)
+    failed = sum(1 for result in results if not result.succeeded)
+    return len(results) / elapsed, p50, p99, failed
+
+def report(name, throughput, p50, p99, unit, extra=''):
+    print('{:<44} {:>12,.0f} {}/s   p50 {:>9.3f} ms   p99 {:>9.3f} ms {}'.format(name, throughput, unit, p50 * 1000, p99 * 1000, extra))
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks of the tracker parsing helpers and submission path.')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes, for a fast smoke run.')
+    args = parser.parse_args()
+
+    rounds = 5 if args.quick else 20
+    years = 5 if args.quick else 50
+    intervals = 100 if args.quick else 1000
+
+    report('parseDateInstruction ({} years)'.format(years), *benchParseDateInstruction(rounds, years), 'intervals')
+    report('handleDateRanges ({} years)'.format(years), *benchHandleDateRanges(rounds, years), 'days')
+    report('removeExceptDates ({} years)'.format(years), *benchRemoveExceptDates(rounds, years), 'intervals')
+
+    for latency, errorRate in ((0.0, 0.0), (0.01, 0.0), (0.01, 0.05)):
+        for maxWorkers in (1, 8):
+            throughput, p50, p99, failed = benchExecute(intervals, latency, errorRate, maxWorkers)
+            name = 'execute ({} requests, {:.0f} ms, {:.0%} errors, {} workers)'.format(intervals, latency * 1000, errorRate, maxWorkers)
+            report(name, throughput, p50, p99, 'requests', '  failed {}'.format(failed))
+
+if __name__ == '__main__':
+    main()
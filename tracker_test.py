@@ -1,10 +1,24 @@
+import datetime
+import logging
+import os
+import requests
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 from tracker import Tracker
+from transport import Transport
+from cache import FileCache
+from ledger import Ledger
+from retry import RetryPolicy
+from spool import Spool
+from stubserver import StubServer
 
 class JttTrackerTest(unittest.TestCase):
 
-    def __init__(self):
-        obj = Tracker('user', 'pass', 'https://test.com', "https://test.com", '09:00', '17:00', 'TASK')
+    def setUp(self):
+        self.obj = Tracker('user', 'pass', 'https://test.com', "https://test.com", '09:00', '17:00', 'TASK')
 
     def test_SplitDateAndTime(self):
         
@@ -16,10 +30,6 @@ class JttTrackerTest(unittest.TestCase):
         self.assertEqual(date, '2024-02-26/2024-03-01')
         self.assertEqual(time, '')
 
-    def test_FormatIsoDateTime(self):
-
-        self.assertEqual(self.obj.formatIsoDateTime('2024-02-26', '09:00'), '2024-02-26T09:00:00.000Z')
-
     def test_FormatTime(self):
 
         start, end = self.obj.formatTime('08:00-13:00')
@@ -33,6 +43,16 @@ class JttTrackerTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.obj.formatTime('09:00')
 
+    def test_ParseClock(self):
+
+        self.assertEqual(self.obj.parseClock('9:30'), 9 * 3600 + 30 * 60)
+        self.assertEqual(self.obj.parseClock('24:00'), 86400)
+        for clock in ('24:30', '25:00', '12:60', '9'):
+            with self.assertRaises(ValueError):
+                self.obj.parseClock(clock)
+        with self.assertRaises(ValueError):
+            list(self.obj.planIntervals('2024-02-05[09:00-24:30]'))
+
         with self.assertRaises(ValueError):
             self.obj.formatTime('09:00-10:00-11:00')
 
@@ -105,9 +125,504 @@ class JttTrackerTest(unittest.TestCase):
         self.assertEqual(self.obj.parseWholeWeek('2024-01-01[09:00-17:00]'), '2023-12-31/2024-01-06[09:00-17:00]')
 
     def test_ParseSingleDateInstruction(self):
-        parsedDate = self.obj.parseSingleDateInstruction('2020-11-30[09:00-13:00]')
+        parsedDate = list(self.obj.parseSingleDateInstruction('2020-11-30[09:00-13:00]'))
         expected = [self.obj.TrackInterval('2020-11-30T09:00:00.000Z', '2020-11-30T13:00:00.000Z')]
         self.assertEqual(parsedDate, expected)
-        parsedDate = self.obj.parseSingleDateInstruction('2020-11-30/2020-12-01[09:00-13:00]')
+        parsedDate = list(self.obj.parseSingleDateInstruction('2020-11-30/2020-12-01[09:00-13:00]'))
         expected = [self.obj.TrackInterval('2020-11-30T09:00:00.000Z', '2020-11-30T13:00:00.000Z'), self.obj.TrackInterval('2020-12-01T09:00:00.000Z', '2020-12-01T13:00:00.000Z')]
-        self.assertEqual(parsedDate, expected)
\ No newline at end of file
+        self.assertEqual(parsedDate, expected)
+
+    def test_ExecuteReportsEveryInterval(self):
+
+        self.obj.trackingUrl = 'https://test.com/track'
+        authResponse = mock.Mock(status_code=200, headers={'Set-Cookie': 'JSESSIONID=ABC; Path=/'})
+
+        def post(url, json=None, headers=None):
+            if url == self.obj.authUrl:
+                return authResponse
+            self.assertEqual(headers, {'Cookie': 'JSESSIONID=ABC'})
+            status = 500 if json['startTime'].startswith('2024-02-06') else 200
+            return mock.Mock(status_code=status, text='')
+
+        with mock.patch.object(self.obj.transport, 'post', side_effect=post):
+            results = self.obj.execute('2024-02-05/2024-02-07', issueId='TASK-1')
+
+        self.assertEqual([result.interval.startIso for result in results],
+                         ['2024-02-05T09:00:00.000Z', '2024-02-06T09:00:00.000Z', '2024-02-07T09:00:00.000Z'])
+        self.assertEqual([result.succeeded for result in results], [True, False, True])
+        self.assertEqual([result.status for result in results], [200, 500, 200])
+        self.assertTrue(all(result.issueId == 'TASK-1' for result in results))
+
+    def test_SubmitIntervalsBoundsConcurrency(self):
+
+        self.obj.maxWorkers = 2
+        lock = threading.Lock()
+        inFlight = [0, 0]
+
+        def sendRequest(body):
+            with lock:
+                inFlight[0] += 1
+                inFlight[1] = max(inFlight[1], inFlight[0])
+            time.sleep(0.01)
+            with lock:
+                inFlight[0] -= 1
+            return 200
+
+        self.obj.sendRequest = sendRequest
+        jobs = (('TASK', self.obj.TrackInterval(i, i + 1)) for i in range(10))
+        results = list(self.obj.submitIntervals(jobs))
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(inFlight[1], 2)
+
+    def test_SubmitIntervalCapturesErrors(self):
+
+        self.obj.sendRequest = mock.Mock(side_effect=ConnectionError('boom'))
+        result = self.obj.submitInterval('TASK', self.obj.TrackInterval(0, 60))
+
+        self.assertFalse(result.succeeded)
+        self.assertIsNone(result.status)
+        self.assertEqual(result.error, 'boom')
+
+    def test_TransportIgnoresServerCookies(self):
+
+        transport = Transport(poolSize=3, connectTimeout=1, readTimeout=2)
+        self.assertEqual(transport.timeout, (1.0, 2.0))
+        self.assertEqual(transport.session.get_adapter('https://test.com')._pool_maxsize, 3)
+
+        self.assertTrue(transport.session.cookies._policy.is_not_allowed('test.com'))
+
+    def test_EnsureSessionUsesCache(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.obj.sessionCache = FileCache(os.path.join(directory, 'session'), ttl=60)
+            self.obj.auth = mock.Mock(return_value='JSESSIONID=ABC')
+
+            self.assertEqual(self.obj.ensureSession(), 'JSESSIONID=ABC')
+            self.obj.cookies = ''
+            self.assertEqual(self.obj.ensureSession(), 'JSESSIONID=ABC')
+            self.assertEqual(self.obj.cookies, 'JSESSIONID=ABC')
+            self.obj.auth.assert_called_once()
+
+    def test_SendRequestReauthenticatesOnce(self):
+
+        self.obj.cookies = 'JSESSIONID=OLD'
+
+        def auth():
+            self.obj.cookies = 'JSESSIONID=NEW'
+            return self.obj.cookies
+
+        self.obj.auth = mock.Mock(side_effect=auth)
+        responses = [mock.Mock(status_code=401, text=''), mock.Mock(status_code=200, text='')]
+        with mock.patch.object(self.obj.transport, 'post', side_effect=responses) as post:
+            self.assertEqual(self.obj.sendRequest({}), 200)
+
+        self.assertEqual(post.call_args_list[1].kwargs['headers'], {'Cookie': 'JSESSIONID=NEW'})
+        self.obj.auth.assert_called_once()
+
+        responses = [mock.Mock(status_code=403, text=''), mock.Mock(status_code=403, text='')]
+        with mock.patch.object(self.obj.transport, 'post', side_effect=responses) as post:
+            self.assertEqual(self.obj.sendRequest({}), 403)
+        self.assertEqual(post.call_count, 2)
+
+    def test_ExecuteSkipsSubmittedIntervals(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.obj.ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            self.obj.auth = mock.Mock(return_value='JSESSIONID=ABC')
+            self.obj.sendRequest = mock.Mock(side_effect=lambda body: 500 if body['startTime'].startswith('2024-02-06') else 200)
+
+            results = self.obj.execute('2024-02-05/2024-02-07')
+            self.assertEqual([result.succeeded for result in results], [True, False, True])
+
+            self.obj.sendRequest = mock.Mock(return_value=200)
+            results = self.obj.execute('2024-02-05/2024-02-07')
+            self.assertEqual([result.interval.startIso for result in results], ['2024-02-06T09:00:00.000Z'])
+
+            self.assertEqual(self.obj.execute('2024-02-05/2024-02-07'), [])
+            self.assertEqual(len(self.obj.execute('2024-02-05/2024-02-07', force=True)), 3)
+            self.obj.ledger.close()
+
+    def test_ExecuteImport(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rows.jsonl')
+            with open(path, 'w', encoding='utf-8') as importFile:
+                importFile.write('{"dates": "2024-02-05/2024-02-07", "exceptDates": "2024-02-06"}\n')
+                importFile.write('{"dates": "2024-02-31"}\n')
+                importFile.write('{"dates": "2024-02-08[10:00-12:00]", "issueId": "OTHER"}\n')
+                importFile.write('{"dates": 17}\n')
+                importFile.write('{"dates": "2024-02-09"}\n')
+
+            self.obj.auth = mock.Mock(return_value='JSESSIONID=ABC')
+            self.obj.sendRequest = mock.Mock(side_effect=lambda body: 500 if body['issueKey'] == 'OTHER' else 200)
+            report = self.obj.executeImport(path)
+
+            csvPath = os.path.join(directory, 'rows.csv')
+            with open(csvPath, 'w', encoding='utf-8') as importFile:
+                importFile.write('dates,issue\n2024-02-05,TASK\n')
+            csvReport = self.obj.executeImport(csvPath)
+
+        self.obj.auth.assert_called_once()
+        self.assertEqual(report.rows, 5)
+        self.assertEqual(report.intervals, 4)
+        self.assertEqual(report.succeeded, 3)
+        self.assertEqual([lineNumber for lineNumber, _ in sorted(report.failures)], [2, 3, 4])
+
+        self.assertEqual((csvReport.rows, csvReport.failed, csvReport.error), (0, 1, 'Unknown columns in import file: issue'))
+
+    def test_RemoveExceptDatesCarvesTime(self):
+
+        dates = self.obj.parseDateInstruction('2024-02-05/2024-02-06')
+        result = self.obj.removeExceptDates(dates, self.obj.parseExceptInstruction('2024-02-05[12:00-13:00],2024-02-06'))
+
+        self.assertEqual(result, [self.obj.TrackInterval('2024-02-05T09:00:00.000Z', '2024-02-05T12:00:00.000Z'),
+                                  self.obj.TrackInterval('2024-02-05T13:00:00.000Z', '2024-02-05T17:00:00.000Z')])
+
+    def test_ParseExceptInstruction(self):
+
+        self.assertEqual(list(self.obj.parseExceptInstruction('2024-02-29, 2024-03-01[12:00-13:00]')),
+                         [self.obj.TrackInterval('2024-02-29T00:00:00.000Z', '2024-03-01T00:00:00.000Z'),
+                          self.obj.TrackInterval('2024-03-01T12:00:00.000Z', '2024-03-01T13:00:00.000Z')])
+
+    def test_PlanIntervalsMergesOverlaps(self):
+
+        self.assertEqual(list(self.obj.planIntervals('2024-02-06[13:00-17:00],2024-02-05/2024-02-06[09:00-12:00],2024-02-06[11:00-13:00]')),
+                         [self.obj.TrackInterval('2024-02-05T09:00:00.000Z', '2024-02-05T12:00:00.000Z'),
+                          self.obj.TrackInterval('2024-02-06T09:00:00.000Z', '2024-02-06T17:00:00.000Z')])
+
+        with self.assertRaises(ValueError):
+            list(self.obj.planIntervals('2024-02-06[17:00-09:00]'))
+
+    def test_HandleDateRangesSkipsHolidays(self):
+
+        self.obj.holidays = frozenset([datetime.date(2024, 2, 13), datetime.date(2024, 2, 17)])
+        expected = ['2024-02-12', '2024-02-14', '2024-02-15', '2024-02-16']
+        self.assertEqual(self.obj.handleDateRanges('2024-02-10/2024-02-18'), expected)
+
+        with mock.patch('tracker.numpy', None):
+            self.assertEqual(self.obj.handleDateRanges('2024-02-10/2024-02-18'), expected)
+
+        self.obj.isWeekendIgnored = False
+        self.assertEqual(self.obj.handleDateRanges('2024-02-16/2024-02-18'), ['2024-02-16', '2024-02-18'])
+
+    def test_TrackInterval(self):
+
+        interval = self.obj.TrackInterval('2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')
+        self.assertEqual((interval.start, interval.end, interval.offset), (1707123600, 1707152400, 0))
+        self.assertEqual(interval.startIso, '2024-02-05T09:00:00.000Z')
+        self.assertEqual(interval, self.obj.TrackInterval(1707123600, 1707152400))
+        self.assertFalse(hasattr(interval, '__dict__'))
+
+        interval = self.obj.TrackInterval('2024-07-01T09:00:00.000+01:00', '2024-07-01T17:00:00.000+01:00')
+        self.assertEqual(interval.offset, 3600)
+        self.assertEqual(interval.endIso, '2024-07-01T17:00:00.000+01:00')
+
+    def test_ParseDateInstructionWithTimezone(self):
+
+        self.obj.timezone = Tracker.toTimezone('Europe/Lisbon')
+        parsedDates = self.obj.parseDateInstruction('2024-03-29/2024-04-01[09:00-10:00]')
+        self.assertNotIsInstance(parsedDates, list)
+
+        self.assertEqual([(interval.startIso, interval.endIso) for interval in parsedDates],
+                         [('2024-03-29T09:00:00.000Z', '2024-03-29T10:00:00.000Z'),
+                          ('2024-04-01T09:00:00.000+01:00', '2024-04-01T10:00:00.000+01:00')])
+
+    def test_ProfilesShareResourcesAndIsolateFailures(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            configPath = os.path.join(directory, 'tracker.conf')
+            with open(configPath, 'w', encoding='utf-8') as configFile:
+                configFile.write('tracking.url = https://test.com/track\nauth.url = https://test.com/auth\n'
+                                 'default.start.time = 09:00\ndefault.end.time = 17:00\ndefault-issue-id = TASK\n'
+                                 'ledger.path = ' + os.path.join(directory, 'ledger.db') + '\n'
+                                 'session.cache = ' + os.path.join(directory, 'session') + '\n'
+                                 'profiles = alice, bob\n'
+                                 'profile.alice.user = alice\nprofile.alice.password = a\n'
+                                 'profile.bob.user = bob\nprofile.bob.password = b\nprofile.bob.default-issue-id = OTHER\n')
+
+            with mock.patch.object(Tracker, 'CONFIG_PATH', configPath):
+                trackers = Tracker.fromConfigProfiles()
+                with self.assertRaises(ValueError):
+                    Tracker.fromConfigProfiles(['carol'])
+
+                with open(configPath, 'a', encoding='utf-8') as configFile:
+                    configFile.write('profile.bob.ledger.path = bob.db\n')
+                with self.assertRaisesRegex(ValueError, r'profile\.bob\.ledger\.path'):
+                    Tracker.fromConfigProfiles()
+
+            alice, bob = trackers['alice'], trackers['bob']
+            self.assertEqual((alice.user, alice.defaultIssueId), ('alice', 'TASK'))
+            self.assertEqual((bob.user, bob.defaultIssueId), ('bob', 'OTHER'))
+            self.assertIs(alice.transport, bob.transport)
+            self.assertEqual((alice.ledger.account, bob.ledger.account), ('alice', 'bob'))
+
+            alice.ensureSession = mock.Mock()
+            alice.sendRequest = mock.Mock(return_value=200)
+            bob.ensureSession = mock.Mock(side_effect=Exception('Failed to authenticate'))
+
+            outcomes = Tracker.executeProfiles(trackers, dates='2024-02-05/2024-02-06')
+            self.assertEqual([result.succeeded for result in outcomes['alice']], [True, True])
+            self.assertEqual(str(outcomes['bob']), 'Failed to authenticate')
+            self.assertIn('Failed to authenticate', Tracker.summarizeProfiles(trackers, outcomes))
+            alice.ledger.close()
+
+    def test_SendRequestRetriesTransientFailures(self):
+
+        self.obj.retryPolicy = RetryPolicy(maxAttempts=3, baseDelay=0, maxDelay=0)
+        self.obj.rateLimiter.pauseFor = mock.Mock()
+        responses = [mock.Mock(status_code=502, text='', headers={}), mock.Mock(status_code=429, text='', headers={'Retry-After': '0'}),
+                     mock.Mock(status_code=200, text='')]
+        with mock.patch.object(self.obj.transport, 'post', side_effect=responses):
+            self.assertEqual(self.obj.sendRequest({}), 200)
+        self.obj.rateLimiter.pauseFor.assert_called_once_with(0)
+
+        # Waiting less than the server asks would only be throttled again
+        with mock.patch.object(self.obj.transport, 'post', return_value=mock.Mock(status_code=429, text='', headers={'Retry-After': '120'})) as post:
+            self.assertEqual(self.obj.sendRequest({}), 429)
+        self.assertEqual(post.call_count, 1)
+        self.obj.rateLimiter.pauseFor.assert_called_once_with(0)
+
+        responses = [requests.ConnectionError('reset')] + [mock.Mock(status_code=503, text='', headers={})] * 2
+        with mock.patch.object(self.obj.transport, 'post', side_effect=responses) as post:
+            self.assertEqual(self.obj.sendRequest({}), 503)
+        self.assertEqual(post.call_count, 3)
+
+        with mock.patch.object(self.obj.transport, 'post', side_effect=requests.ReadTimeout('slow')) as post:
+            with self.assertRaises(requests.ReadTimeout):
+                self.obj.sendRequest({})
+        self.assertEqual(post.call_count, 1)
+
+    def test_LoggingIsConfiguredOnce(self):
+
+        logger = logging.getLogger('tracker')
+        handlers = list(logger.handlers)
+        Tracker('user', 'pass', 'https://test.com', "https://test.com", '09:00', '17:00', 'TASK', logLevel='DEBUG')
+
+        self.assertEqual(logger.handlers, handlers)
+        self.assertEqual(self.obj.consoleHandler.level, logging.DEBUG)
+
+    def test_ExecuteAgainstStubServer(self):
+
+        with StubServer() as stub:
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK')
+            results = tracker.execute('2024-02-05/2024-02-09', exceptDates='2024-02-07')
+
+            self.assertEqual([result.status for result in results], [200] * 4)
+            self.assertEqual(sorted(worklog['startTime'] for worklog in stub.worklogs),
+                             ['2024-02-05T09:00:00.000Z', '2024-02-06T09:00:00.000Z', '2024-02-08T09:00:00.000Z', '2024-02-09T09:00:00.000Z'])
+
+            stub.errorRate = 1.0
+            stub.errorStatus = 500
+            results = tracker.execute('2024-02-12')
+            self.assertEqual([(result.succeeded, result.status) for result in results], [(False, 500)])
+            tracker.transport.close()
+
+    def test_ExecuteRecordsMetrics(self):
+
+        with StubServer() as stub, tempfile.TemporaryDirectory() as directory:
+            metricsFile = os.path.join(directory, 'run.prom')
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', metricsFile=metricsFile)
+            tracker.execute('2024-02-05/2024-02-06')
+            tracker.transport.close()
+
+            self.assertEqual(tracker.writeMetrics(), metricsFile)
+            with open(metricsFile) as promFile:
+                text = promFile.read()
+
+        self.assertIn('tracker_auth_seconds_count{status="200"} 1', text)
+        self.assertIn('tracker_parse_seconds_count 1', text)
+        self.assertIn('tracker_request_seconds_count{status="200"} 2', text)
+        self.assertIn('tracker_intervals_total{result="succeeded"} 2', text)
+
+    def test_ExecuteReconcilesWithServer(self):
+
+        with StubServer() as stub:
+            stub.maxPageSize = 2
+            stub.worklogs = [
+                {'issueKey': 'TASK', 'startTime': '2024-02-05T09:00:00.000Z', 'endTime': '2024-02-05T17:00:00.000Z'},
+                {'issueKey': 'TASK', 'startTime': '2024-02-06T09:00:00.000Z', 'endTime': '2024-02-06T12:00:00.000Z'},
+                {'issueKey': 'OTHER', 'startTime': '2024-02-07T15:00:00.000Z', 'endTime': '2024-02-07T18:00:00.000Z'},
+                {'issueKey': 'TASK', 'startTime': '2024-02-12T09:00:00.000Z', 'endTime': '2024-02-12T17:00:00.000Z'},
+                {'issueKey': 'OTHER', 'startTime': '2024-02-08T09:00:00.000Z', 'endTime': '2024-02-08T10:00:00.000Z'},
+            ]
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', worklogUrl=stub.worklogUrl)
+
+            results = tracker.execute('2024-02-05/2024-02-08', dryRun=True, reconcile=True)
+            self.assertEqual((results, len(stub.worklogs)), ([], 5))
+
+            results = tracker.execute('2024-02-05/2024-02-08', reconcile=True)
+            tracker.transport.close()
+
+        self.assertEqual([(result.interval.startIso, result.interval.endIso) for result in results], [
+            ('2024-02-06T12:00:00.000Z', '2024-02-06T17:00:00.000Z'),
+            ('2024-02-07T09:00:00.000Z', '2024-02-07T15:00:00.000Z'),
+            ('2024-02-08T10:00:00.000Z', '2024-02-08T17:00:00.000Z'),
+        ])
+        # Counted by the dry run and by the real one
+        self.assertEqual(tracker.metrics.counters[('tracker_intervals_total', (('result', 'conflict'),))], 4)
+
+    def test_FetchWorklogsPagesListResponses(self):
+
+        self.obj.worklogUrl = 'https://test.com/worklogs'
+        self.obj.cookies = 'JSESSIONID=ABC'
+        self.obj.WORKLOG_PAGE_SIZE = 2
+        worklogs = [{'issueKey': 'TASK', 'startTime': str(i), 'endTime': str(i)} for i in range(5)]
+
+        def get(url, params=None, headers=None):
+            return mock.Mock(status_code=200, json=lambda: worklogs[params['startAt']:params['startAt'] + params['maxResults']])
+
+        with mock.patch.object(self.obj.transport, 'get', side_effect=get) as transportGet:
+            self.assertEqual(self.obj.fetchWorklogs(19758, 19762), worklogs)
+
+        self.assertEqual(transportGet.call_count, 3)
+        self.assertEqual((transportGet.call_args.kwargs['params']['from'], transportGet.call_args.kwargs['params']['to']), ('2024-02-05', '2024-02-09'))
+
+    def test_ReconcileNeedsWorklogUrl(self):
+
+        with self.assertRaises(ValueError):
+            self.obj.execute('2024-02-05', reconcile=True)
+
+    def test_SpoolIsFlushedOnceTheServerIsBack(self):
+
+        with StubServer(errorRate=1.0) as stub, tempfile.TemporaryDirectory() as directory:
+            ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            spool = Spool(os.path.join(directory, 'tracker.spool'))
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', ledger=ledger, spool=spool,
+                              retryPolicy=RetryPolicy(maxAttempts=1, baseDelay=0.01))
+
+            self.assertEqual(tracker.spoolIntervals('2024-02-05/2024-02-07'), 3)
+            self.assertEqual(stub.requestCount, 0)
+
+            # Server down: everything stays in the spool
+            self.assertEqual([result.status for result in tracker.flushSpool()], [503] * 3)
+            self.assertTrue(spool.hasPending())
+            self.assertFalse(os.path.exists(spool.failedPath))
+
+            stub.errorRate = 0.0
+            # Submitted by a previous run: the ledger keeps it from being sent twice
+            ledger.forAccount('user').record('TASK', '2024-02-05T09:00:00.000Z', '2024-02-05T17:00:00.000Z')
+            self.assertTrue(tracker.drainSpool(timeout=5))
+            tracker.transport.close()
+            ledger.close()
+
+            self.assertEqual(sorted(worklog['startTime'] for worklog in stub.worklogs), ['2024-02-06T09:00:00.000Z', '2024-02-07T09:00:00.000Z'])
+            self.assertFalse(spool.hasPending())
+            self.assertEqual(os.path.getsize(spool.path), 0)
+
+    def test_SpoolGivesUpOnRejectedIntervals(self):
+
+        with StubServer(errorRate=1.0, errorStatus=400) as stub, tempfile.TemporaryDirectory() as directory:
+            ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            spool = Spool(os.path.join(directory, 'tracker.spool'))
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', ledger=ledger, spool=spool)
+
+            tracker.spoolIntervals('2024-02-05')
+            # Not everything was tracked
+            self.assertFalse(tracker.drainSpool(timeout=5))
+            self.assertFalse(spool.hasPending())
+            tracker.transport.close()
+            ledger.close()
+
+            with open(spool.failedPath) as failedFile:
+                self.assertIn('Server returned status code: 400', failedFile.read())
+
+    def test_SpoolKeepsIntervalsThroughAnOutage(self):
+
+        with StubServer() as stub, tempfile.TemporaryDirectory() as directory:
+            ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            spool = Spool(os.path.join(directory, 'tracker.spool'))
+            # A cached session and a server refusing connections
+            sessionCache = FileCache(os.path.join(directory, 'session'), 1800)
+            sessionCache.put('user@' + stub.authUrl, 'JSESSIONID=' + stub.SESSION_ID)
+            stub.stop()
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', ledger=ledger, spool=spool,
+                              sessionCache=sessionCache, retryPolicy=RetryPolicy(maxAttempts=1, baseDelay=0.01, maxDelay=0.01))
+
+            tracker.spoolIntervals('2024-02-05/2024-02-06')
+            self.assertFalse(tracker.drainSpool(timeout=0.5))
+            tracker.transport.close()
+            ledger.close()
+
+            self.assertEqual(len(spool.readPending(10)[0]), 2)
+            self.assertFalse(os.path.exists(spool.failedPath))
+
+    def test_SpoolChecksIssues(self):
+
+        with StubServer() as stub, tempfile.TemporaryDirectory() as directory:
+            stub.issues = {'DONE-1': 'done'}
+            ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            spool = Spool(os.path.join(directory, 'tracker.spool'))
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK', ledger=ledger, spool=spool,
+                              issueSearchUrl=stub.searchUrl)
+
+            with self.assertRaisesRegex(ValueError, r'issue \[DONE-1\] is closed'):
+                tracker.spoolIntervals('2024-02-05', issueId='DONE-1')
+            tracker.transport.close()
+            ledger.close()
+
+            self.assertFalse(spool.hasPending())
+
+    def test_SpoolNeedsLedger(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.obj.spool = Spool(os.path.join(directory, 'tracker.spool'))
+            with self.assertRaises(ValueError):
+                self.obj.spoolIntervals('2024-02-05')
+
+    def test_ProfilesDoNotShareSpools(self):
+
+        configs = {'spool.path': mock.Mock(data='/tmp/tracker.spool'), 'profile.bob.spool.path': mock.Mock(data='/tmp/bob.spool')}
+        self.assertEqual(Tracker.spoolPathFromConfig(configs), '/tmp/tracker.spool')
+        self.assertEqual(Tracker.spoolPathFromConfig(configs, 'alice'), '/tmp/tracker.spool.alice')
+        self.assertEqual(Tracker.spoolPathFromConfig(configs, 'bob'), '/tmp/bob.spool')
+        self.assertEqual(Tracker.spoolPathFromConfig({}, 'alice'), Tracker.SPOOL_PATH + '.alice')
+
+    def test_ReportFromLedger(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            ledger = Ledger(os.path.join(directory, 'ledger.db'))
+            tracker = Tracker('user', 'pass', 'https://test.com/track', 'https://test.com/auth', '09:00', '17:00', 'TASK', ledger=ledger)
+            for interval in tracker.planIntervals('2024-02-05/2024-02-09', exceptDates='2024-02-07[12:00-13:00]'):
+                tracker.ledger.record('TASK', interval.startIso, interval.endIso)
+
+            rows = tracker.report('issue', '2024-02-05/2024-02-06')
+            self.assertEqual([(row.issueKey, row.hours, row.intervals) for row in rows], [('TASK', 16.0, 2)])
+            self.assertEqual(sum(row.hours for row in tracker.report('week')), 39.0)
+            ledger.close()
+
+        with self.assertRaises(ValueError):
+            self.obj.report()
+
+    def test_IssuesAreCheckedBeforeTracking(self):
+
+        with StubServer() as stub, tempfile.TemporaryDirectory() as directory:
+            stub.issues = {'TASK-1': 'indeterminate', 'TASK-2': 'new', 'DONE-1': 'done'}
+            issueCache = FileCache(os.path.join(directory, 'issues'), 3600)
+            tracker = Tracker('user', 'pass', stub.trackingUrl, stub.authUrl, '09:00', '17:00', 'TASK-1',
+                              issueSearchUrl=stub.searchUrl, issueCache=issueCache)
+            tracker.ISSUE_BATCH_SIZE = 2
+
+            self.assertEqual(tracker.findInvalidIssues(['TASK-1', 'TASK-2', 'DONE-1', 'NOPE-1', 'TASK-1']), {
+                'DONE-1': 'is closed (status [Done])',
+                'NOPE-1': 'does not exist or is not visible to user [user]'})
+            # One authentication and two searches of two keys
+            self.assertEqual(stub.requestCount, 3)
+
+            with self.assertRaisesRegex(ValueError, r'issue \[DONE-1\] is closed'):
+                tracker.execute('2024-02-05', issueId='DONE-1')
+            results = tracker.execute('2024-02-05', issueId='TASK-2')
+
+            # Answered by the cache: only the tracking request reached the server
+            self.assertEqual(stub.requestCount, 4)
+            self.assertEqual([result.status for result in results], [200])
+
+            path = os.path.join(directory, 'rows.jsonl')
+            with open(path, 'w', encoding='utf-8') as importFile:
+                importFile.write('{"dates": "2024-02-06"}\n')
+                importFile.write('{"dates": "2024-02-06", "issueId": "NEW-1"}\n')
+            report = tracker.executeImport(path)
+            tracker.transport.close()
+
+        self.assertEqual((report.succeeded, report.failures), (1, [(2, 'Issue [NEW-1] does not exist or is not visible to user [user]')]))
+        self.assertEqual(len(stub.worklogs), 2)
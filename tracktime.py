@@ -1,6 +1,6 @@
 import argparse
 import os
-from tracker import Tracker
+import sys
 
 def main():
 
@@ -12,19 +12,59 @@ def main():
         password           = ****            (mandatory)
         tracking.url       = URL             (mandatory)
         auth.url           = URL             (mandatory)
+        worklog.url        = URL             (May be ommited. Lists the worklogs already on the server, needed by --reconcile)
+        issue.search.url   = URL             (May be ommited. JQL search used to check that issues exist and are open before tracking)
+        issue.cache          = PATH          (May be ommited. File caching the checked issues. Default value: ./.tracker.issues)
+        issue.cache.ttl      = SECONDS       (May be ommited. Time to trust a checked issue, 0 disables the cache. Default value: 3600)
         default.start.time = HH:MM           (If not provided, user must provide it in tool arguments)
         default.end.time   = HH:MM           (If not provided, user must provide it in tool arguments)
         default-issue-id   = ISSUE_ID        (If not provided, user must provide it in tool arguments)
         ignore-weekends    = [true/false]    (May be ommited. Default value: true)
         log-level          = [INFO/DEBUG]    (May be ommited. Default value: INFO)
+        max-workers        = N               (May be ommited. Maximum concurrent tracking requests. Default value: 4)
+        http.pool.size       = N             (May be ommited. Pooled keep-alive connections. Default value: 10 or max-workers if larger)
+        http.connect.timeout = SECONDS       (May be ommited. Default value: 5.0)
+        http.read.timeout    = SECONDS       (May be ommited. Default value: 30.0)
+        session.cache        = PATH          (May be ommited. File caching the authenticated session. Default value: ./.tracker.session)
+        session.ttl          = SECONDS       (May be ommited. Time to reuse a cached session, 0 disables it. Default value: 1800)
+        holidays.files       = PATH[,PATH]   (May be ommited. .ics or .csv calendars of holidays skipped in date ranges)
+        retry.max-attempts   = N             (May be ommited. Attempts for throttled (429), unavailable (502/503/504) or failed connections. Default value: 5)
+        retry.base-delay     = SECONDS       (May be ommited. First backoff delay, doubled on every retry, with random jitter. Default value: 0.5)
+        retry.max-delay      = SECONDS       (May be ommited. Longest wait between retries. A longer Retry-After fails the request. Default value: 30.0)
+        rate-limit           = N             (May be ommited. Maximum tracking requests per second, 0 for no limit. Default value: 0)
+        rate-limit.burst     = N             (May be ommited. Requests allowed at once before the rate limit applies. Default value: rate-limit)
+        timezone             = ZONE          (May be ommited. Timezone of the informed times, e.g. Europe/Lisbon. Default value: UTC)
+        ledger.path          = PATH          (May be ommited. Database of submitted intervals, empty disables it. Default value: ./tracker.ledger.db)
+        metrics.file         = PATH          (May be ommited. Counters and latencies written at the end of every run: a Prometheus
+                                              textfile when PATH ends with .prom, a JSON summary otherwise)
+        spool.path           = PATH          (May be ommited. Intervals queued by --spool until they are sent. Default value: ./tracker.spool)
+        spool.flush-timeout  = SECONDS       (May be ommited. Time the background flush of the spool keeps retrying. Default value: 600)
+        daemon.port          = PORT          (May be ommited. Localhost port of --serve. Default value: 8737)
+        daemon.batch-window  = SECONDS       (May be ommited. Time --serve waits to batch submissions together. Default value: 0.05)
+        profiles             = NAME[,NAME]   (May be ommited. Accounts usable with --profiles. Any setting above can be overridden
+                                              per account as profile.NAME.<setting>, e.g. profile.alice.user = alice, except
+                                              http.*, session.*, ledger.path, issue.cache*, metrics.file and daemon.*,
+                                              which every account shares)
 
         Common Examples of Usage:
         - tracktime: Track time for today using default start and end times.
         - tracktime --wholeWeek: Track time for all days of the current week, from Sunday until Saturday. Note that if --includeWeekends is false (default), it will only track from Monday to Friday.
         - tracktime --wholeWeek --includeWeekends: Track time for the entire current week, including weekends.
-        - tracktime 10/14[08:00-16:00] --exceptDates 13: Track time from the 10th to the 14th of the current month, between 08:00 and 16:00, excluding the 13th (for example, if it's a holiday).
+        - tracktime --dates 10/14[08:00-16:00] --exceptDates 13: Track time from the 10th to the 14th of the current month, between 08:00 and 16:00, excluding the 13th (for example, if it's a holiday).
+        - tracktime --dates 10/14 --exceptDates 10/14[12:00-13:00]: Track time from the 10th to the 14th, split around a lunch break every day.
         - tracktime --dates 2024-03-01[09:00-12:00] --log-level DEBUG: Track time on March 1st, 2024, from 09:00 to 12:00. Will register DEBUG messages in the console.
         - tracktime --dates 2024-02-15/2024-02-28 --includeWeekends: Track time between February 15th and February 28th, 2024, including weekends, and using default start and end times.
+        - tracktime --wholeWeek --force: Track time for the current week again, even for days already submitted in a previous run.
+        - tracktime --import worklogs.jsonl: Track every row of a JSONL (or .csv) file in a single run. Each row accepts the fields
+          dates (mandatory), issueId, exceptDates and wholeWeek. Ex: {"dates": "02-05/02-09", "issueId": "TASK-1", "exceptDates": "02-07"}
+        - tracktime --wholeWeek --profiles all: Track the current week for every account listed in 'profiles', in parallel, and print a summary per account.
+        - tracktime --dates 02-01/02-29 --reconcile --dryRun: Show what is missing on the server for February, without sending anything.
+        - tracktime --wholeWeek --metricsFile run.prom --cprofile: Track the current week, write its metrics for Prometheus and print where the time went.
+        - tracktime --wholeWeek --spool: Queue the current week locally and return at once. It is sent in the background, even if the server is down for a while.
+        - tracktime --report week --dates 01-01/12-31: Hours tracked per week and issue this year, from the local ledger.
+        - tracktime --report issue --dates 02-01/02-29 --reportFormat csv --output february.csv: Hours per issue in February, as CSV.
+        - tracktime --serve: Keep a tracker running on localhost, authenticated and ready.
+        - tracktime --dates 17 --daemon: Track the 17th through the running daemon, which answers in milliseconds. Tracks directly when no daemon is running.
         - tracktime --generateConf: Generate a template configuration file named 'tracker.conf'. Useful for the first usage of the tool.
         ''',
         formatter_class=CustomFormatter
@@ -45,19 +85,167 @@ def main():
     ''')
 
     parser.add_argument('-i', '--issueId', type=str, help='Specify the issue ID where you want to track time. Mandatory if not provided any default issue ID in the config file')
-    parser.add_argument('--exceptDates', type=str, help='Specify dates that need to be excluded.')
+    parser.add_argument('--exceptDates', type=str, help='''
+        Specify dates that need to be excluded, in the same format as --dates.
+        A date without time range excludes the whole day. With a time range only that part is excluded.
+        Ex: '13' skips the 13th, '13[12:00-13:00]' removes a lunch break from the 13th.
+    ''')
     parser.add_argument('--wholeWeek', action='store_true', help='Track time for the entire week to which the specified date belongs, if enabled.')
     parser.add_argument('--includeWeekends', action='store_true', help='Include weekends in the tracking if enabled.')
     parser.add_argument('--logLevel', type=str, default='INFO', help='Specify the desired log level for console output during execution. Default value: INFO.')
+    parser.add_argument('--force', action='store_true', help='Submit intervals again even if a previous run already submitted them.')
+    parser.add_argument('--reconcile', action='store_true', help='Fetch the worklogs already on the server and only track what is missing. Parts overlapping worklogs of other issues are reported, not tracked.')
+    parser.add_argument('--dryRun', action='store_true', help='Only print the intervals that would be tracked. Nothing is sent.')
+    parser.add_argument('--import', dest='importFile', type=str, help='Track the rows of a CSV or JSONL file instead of --dates. Failures are reported with their line number.')
+    parser.add_argument('--profiles', type=str, help='Track time for several accounts of the config file in parallel. Comma separated profile names, or \'all\'.')
+    parser.add_argument('--metricsFile', type=str, help='Write the counters and latencies of the run to this file (.prom for Prometheus, JSON otherwise). Overrides metrics.file.')
+    parser.add_argument('--cprofile', nargs='?', const='tracker.prof', metavar='PATH', help='Profile the run with cProfile, print the slowest functions and dump the stats to PATH. Default value: tracker.prof')
+    parser.add_argument('--spool', action='store_true', help='Queue the intervals in the local spool and return at once. A background process sends them, retrying while the server is down.')
+    parser.add_argument('--flushSpool', action='store_true', help='Send the intervals queued with --spool, retrying for up to spool.flush-timeout seconds.')
+    parser.add_argument('--report', nargs='?', const='day', choices=['day', 'week', 'month', 'issue'],
+                        help='Print the time tracked per day, week or month and issue, or per issue only, from the ledger. Limit it with --dates and --issueId. Default value: day')
+    parser.add_argument('--reportFormat', choices=['table', 'csv', 'json'], default='table', help='Format of --report. Default value: table')
+    parser.add_argument('--output', type=str, help='Write --report to this file instead of the console.')
+    parser.add_argument('--serve', action='store_true', help='Run as a daemon on localhost, keeping an authenticated session for --daemon calls. Only callers able to read the token it writes to ./.tracker.daemon.token are served. Stop it with Ctrl+C.')
+    parser.add_argument('--daemon', action='store_true', help='Send the dates to the daemon started with --serve instead of tracking them in this process.')
+    parser.add_argument('--port', type=int, help='Localhost port of the daemon. Overrides daemon.port. Default value: 8737')
     parser.add_argument('--generateConf', action='store_true', help='Generate a template configuration file named \'tracker.conf\'. Useful for the first usage of the tool')
 
     args = parser.parse_args()
 
+    # --profiles only tracks dates, the other modes work on a single account
+    if args.profiles:
+        modes = {'--import': args.importFile, '--report': args.report, '--spool': args.spool, '--flushSpool': args.flushSpool,
+                 '--serve': args.serve, '--daemon': args.daemon}
+        conflicting = [mode for mode, value in modes.items() if value]
+        if conflicting:
+            parser.error('--profiles cannot be combined with {}'.format(', '.join(conflicting)))
+
+    if args.daemon:
+        isFailed = trackWithDaemon(args)
+        if isFailed is not None:
+            sys.exit(1 if isFailed else 0)
+
+    # Imported only now, so --help and --daemon do not pay for it
+    from tracker import Tracker
+
     if args.generateConf:
         Tracker.generateTemplateConfFile()
+        return
+
+    if args.serve:
+        serve(Tracker, args)
+        return
+
+    profiler = None
+    if args.cprofile:
+        from profiling import RunProfiler
+        profiler = RunProfiler()
+        profiler.start()
+
+    try:
+        isFailed = run(Tracker, args, profiler)
+    finally:
+        if profiler:
+            profiler.stop(args.cprofile)
+
+    if isFailed:
+        sys.exit(1)
+
+# Track time as asked by the arguments. Returns whether anything failed.
+def run(Tracker, args, profiler):
+
+    if args.profiles:
+        profiles = None if args.profiles == 'all' else [profile.strip() for profile in args.profiles.split(',')]
+        trackers = Tracker.fromConfigProfiles(profiles)
+        for tracker in trackers.values():
+            tracker.profiler = profiler
+        outcomes = Tracker.executeProfiles(trackers, dates=args.dates, exceptDates=args.exceptDates, isWholeWeek=args.wholeWeek,
+                                           issueId=args.issueId, logLevel=args.logLevel, force=args.force,
+                                           reconcile=args.reconcile, dryRun=args.dryRun)
+        print(Tracker.summarizeProfiles(trackers, outcomes))
+        # The trackers share their metrics
+        next(iter(trackers.values())).writeMetrics(args.metricsFile)
+        return any(isinstance(outcome, Exception) or any(not result.succeeded for result in outcome) for outcome in outcomes.values())
+
+    obj = Tracker.fromConfigFile()
+    obj.profiler = profiler
+    try:
+        if args.report:
+            printReport(obj, args)
+            return False
+
+        if args.spool:
+            obj.spoolIntervals(dates=args.dates, exceptDates=args.exceptDates, isWholeWeek=args.wholeWeek, issueId=args.issueId)
+            startSpoolFlusher()
+            return False
+
+        if args.flushSpool:
+            return not obj.drainSpool()
+
+        if args.importFile:
+            report = obj.executeImport(args.importFile, logLevel=args.logLevel, force=args.force)
+            return report.failed > 0
+
+        results = obj.execute(dates=args.dates, exceptDates=args.exceptDates, isWholeWeek=args.wholeWeek, issueId=args.issueId, logLevel=args.logLevel, force=args.force,
+                              reconcile=args.reconcile, dryRun=args.dryRun)
+        return any(not result.succeeded for result in results)
+    finally:
+        obj.writeMetrics(args.metricsFile)
+
+def printReport(tracker, args):
+
+    import reports
+
+    content = reports.formatReport(tracker.report(args.report, args.dates, args.issueId), args.reportFormat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as outputFile:
+            outputFile.write(content)
     else:
-        obj = Tracker.fromConfigFile()
-        obj.execute(dates=args.dates, exceptDates=args.exceptDates, isWholeWeek=args.wholeWeek, issueId=args.issueId, logLevel=args.logLevel)
+        print(content)
+
+# Send the spool from a detached process, which outlives this one
+def startSpoolFlusher():
+
+    import subprocess
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--flushSpool', '--logLevel', 'WARNING'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+# Returns whether anything failed, or None when no daemon is running
+def trackWithDaemon(args):
+
+    import daemon
+
+    request = {'dates': args.dates, 'exceptDates': args.exceptDates, 'issueId': args.issueId, 'wholeWeek': args.wholeWeek, 'force': args.force}
+    # The same port as --serve, which reads daemon.port too
+    port = args.port or daemon.configuredPort()
+    try:
+        response = daemon.submitToDaemon(request, port)
+    except ValueError as e:
+        print('Daemon rejected the submission: {}'.format(e), file=sys.stderr)
+        return True
+    except OSError:
+        print('No daemon running on port [{}]. Tracking directly'.format(port), file=sys.stderr)
+        return None
+
+    for result in response['results']:
+        outcome = 'skipped, already submitted' if result.get('skipped') else 'tracked' if result['succeeded'] else 'failed: ' + str(result['error'])
+        print('{} [{} - {}] {}'.format(result['issueId'], result['startTime'], result['endTime'], outcome))
+
+    return any(not result['succeeded'] for result in response['results'])
+
+def serve(Tracker, args):
+
+    from daemon import TrackerDaemon, DEFAULT_PORT, DEFAULT_BATCH_WINDOW
+
+    configs = Tracker.loadConfigFile()
+    tracker = Tracker.fromConfig(configs)
+    port = args.port or Tracker.getConfig(configs, 'daemon.port', DEFAULT_PORT)
+    trackerDaemon = TrackerDaemon(tracker, port, Tracker.getConfig(configs, 'daemon.batch-window', DEFAULT_BATCH_WINDOW))
+    try:
+        trackerDaemon.serveForever()
+    except KeyboardInterrupt:
+        trackerDaemon.stop()
 
 class CustomFormatter(argparse.RawTextHelpFormatter):
     def _split_lines(self, text, width):
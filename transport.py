@@ -0,0 +1,67 @@
+import threading
+
+# Pooled, keep-alive HTTP session shared by every request a Tracker makes.
+# Connections are reused across auth and tracking calls, so a large run pays the
+# TCP+TLS handshake once per pooled connection instead of once per request.
+# requests is slow to import, so it is only loaded when the first request is made.
+class Transport:
+
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_CONNECT_TIMEOUT = 5.0
+    DEFAULT_READ_TIMEOUT = 30.0
+
+    def __init__(self, poolSize=DEFAULT_POOL_SIZE, connectTimeout=DEFAULT_CONNECT_TIMEOUT, readTimeout=DEFAULT_READ_TIMEOUT):
+
+        self.poolSize = max(1, int(poolSize))
+        # Never wait forever on a hung server: both timeouts are always set
+        self.timeout = (float(connectTimeout), float(readTimeout))
+        self.httpSession = None
+        self.sessionLock = threading.Lock()
+
+    @property
+    def session(self):
+
+        if self.httpSession is None:
+            with self.sessionLock:
+                if self.httpSession is None:
+                    self.httpSession = self.createSession()
+
+        return self.httpSession
+
+    def createSession(self):
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from http.cookiejar import DefaultCookiePolicy
+
+        session = requests.Session()
+
+        # Cookies are filtered and attached by the Tracker (see Tracker.filterCookies),
+        # so the session must not collect Set-Cookie headers on its own
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        # pool_block keeps the number of open connections at poolSize even when
+        # more threads than that are submitting
+        adapter = HTTPAdapter(pool_connections=self.poolSize, pool_maxsize=self.poolSize, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        return session
+
+    def post(self, url, json=None, headers=None):
+        return self.session.post(url, json=json, headers=headers, timeout=self.timeout)
+
+    def get(self, url, params=None, headers=None):
+        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+    # Network failures worth retrying. Read timeouts are left out on purpose:
+    # the server may have stored the worklog before the response was lost
+    def isTransientError(self, error):
+
+        import requests
+        return isinstance(error, requests.ConnectionError)
+
+    def close(self):
+
+        if self.httpSession is not None:
+            self.httpSession.close()